@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Callable, List, NamedTuple, Optional
+
+from parse_itch5 import PRICE_SCALE
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+_SECOND = 10**9
+
+
+class Bar(NamedTuple):
+    """
+    Trades of a stock during a time interval.
+
+    Attributes:
+    start (int): Start of the interval, in nanoseconds since midnight.
+    open (float): Price of the first trade.
+    high (float): Highest price.
+    low (float): Lowest price.
+    close (float): Price of the last trade.
+    volume (int): Number of shares traded.
+    vwap (float): Volume weighted average price.
+    trades (int): Number of trades.
+    """
+
+    start: int
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: int
+    vwap: float
+    trades: int
+
+
+def bar_name(bar_size: int) -> str:
+    """
+    Names the bars of a size, e.g. bars_300s for five-minute bars, for their files.
+    """
+    if bar_size % _SECOND == 0:
+        return f"bars_{bar_size // _SECOND}s"
+    return f"bars_{bar_size}ns"
+
+
+class BarBuilder:
+    __slots__ = (
+        "bar_size",
+        "integer_prices",
+        "bars",
+        "_emit",
+        "_start",
+        "_end",
+        "_open",
+        "_high",
+        "_low",
+        "_close",
+        "_volume",
+        "_notional",
+        "_trades",
+    )
+
+    def __init__(
+        self,
+        bar_size: int,
+        integer_prices: bool = False,
+        emit: Optional[Callable[[Bar], None]] = None,
+    ) -> None:
+        """
+        Initializes an aggregator of trades into OHLCV bars of a fixed time span.
+
+        Trades are added in time order, and each updates the open bar in constant time. A bar
+        is finished by the first trade after its end (or by close), and only then emitted, so
+        bars hold no state but the open one. Intervals without trades have no bar.
+
+        Parameters:
+        bar_size (int): Time span of each bar in nanoseconds, bars start at multiples of it.
+        integer_prices (bool): If True, the added prices are integer ticks, converted in the bars.
+        emit (Callable[[Bar], None], optional): Called with each finished bar, which is
+            appended to the builder's bars by default.
+
+        Attributes:
+        bars (List[Bar]): The finished bars, unless they are emitted elsewhere.
+        """
+        if bar_size <= 0:
+            raise ValueError("The bar size must be positive.")
+        self.bar_size = bar_size
+        self.integer_prices = integer_prices
+        self.bars: List[Bar] = []
+        self._emit = emit if emit is not None else self.bars.append
+        # End of the open bar, nothing is open while it is not above any timestamp
+        self._start = 0
+        self._end = -1
+        self._open = self._high = self._low = self._close = 0
+        self._volume = 0
+        self._notional = 0
+        self._trades = 0
+
+    def add(self, timestamp: int, shares: int, price: float) -> None:
+        """
+        Adds a trade to the open bar, first emitting the open bar if the trade is past its end.
+
+        Parameters:
+        timestamp (int): Trade timestamp.
+        shares (int): Number of shares traded.
+        price (float): Trade price.
+        """
+        if timestamp >= self._end:
+            if self._trades:
+                self._emit(self._bar())
+            self._start = timestamp - timestamp % self.bar_size
+            self._end = self._start + self.bar_size
+            self._open = self._high = self._low = self._close = price
+            self._volume = shares
+            self._notional = shares * price
+            self._trades = 1
+            return
+        if price > self._high:
+            self._high = price
+        elif price < self._low:
+            self._low = price
+        self._close = price
+        self._volume += shares
+        self._notional += shares * price
+        self._trades += 1
+
+    def _bar(self) -> Bar:
+        scale = PRICE_SCALE if self.integer_prices else 1
+        return Bar(
+            self._start,
+            self._open / scale,
+            self._high / scale,
+            self._low / scale,
+            self._close / scale,
+            self._volume,
+            (
+                self._notional / self._volume / scale
+                if self._volume
+                else self._close / scale
+            ),
+            self._trades,
+        )
+
+    def close(self) -> None:
+        """
+        Emits the open bar, once no more trades will be added.
+        """
+        if self._trades:
+            self._emit(self._bar())
+            self._trades = 0
+            self._end = -1
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Gathers the finished bars into a DataFrame, with the columns of Bar.
+        """
+        import pandas as pd
+
+        return pd.DataFrame(self.bars, columns=Bar._fields)
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sortedcontainers import SortedDict
+
+from orderbook import LEVEL_ORDER_DTYPE, Order, OrderBook
+
+if TYPE_CHECKING:
+    from sinks import HistorySink
+
+
+class BBOBook(OrderBook):
+    def __init__(
+        self,
+        stock_symbol: str,
+        integer_prices: bool = False,
+        columnar: bool = False,
+        sink: Optional[HistorySink] = None,
+        bar_sizes: Sequence[int] = (),
+    ) -> None:
+        """
+        Initializes an order book which only tracks the best bid and offer of a stock.
+
+        The price levels are plain dictionaries of [total shares, order count], and the orders
+        are not queued by time priority, so an update is a couple of dictionary operations.
+        The key of the best level of each side is updated when a better level is added, and
+        is only invalidated when the best level empties; it is then repaired with a scan of
+        the levels the next time the best bid and offer are read, once per message at most.
+
+        The order book history is the BBO change stream: a state, of the layout of an OrderBook
+        of depth 1, is recorded after the messages which changed the best prices or their
+        shares. The other methods of OrderBook are supported, the ladder and the orders of a
+        level being built by sorting and scanning on demand.
+
+        Parameters:
+        stock_symbol (str): Symbol of the stock.
+        integer_prices (bool): If True, prices are integer ticks rather than floats.
+        columnar (bool): If True, the histories are recorded in NumPy columns.
+        sink (HistorySink, optional): Sink of depth 1 streaming the histories to disk.
+        bar_sizes (Sequence[int]): Time spans in nanoseconds of OHLCV bars built from the trades.
+
+        Attributes:
+        buy_levels (Dict[float, List[int]]): Aggregated buy price levels keyed by negated price.
+        sell_levels (Dict[float, List[int]]): Aggregated sell price levels keyed by price.
+        """
+        super().__init__(
+            stock_symbol,
+            1,
+            integer_prices,
+            columnar=columnar,
+            sink=sink,
+            bar_sizes=bar_sizes,
+        )
+        self.track_queues = False
+        self.buy_levels: Dict[float, List[int]] = {}
+        self.sell_levels: Dict[float, List[int]] = {}
+        # Key of the best level of the buy and sell side (the smallest key), None when the
+        # side is empty or the best level must be repaired
+        self._best: List[Optional[float]] = [None, None]
+        # Best bid and offer of the last recorded state, kept apart from the one passed to
+        # the subscribers so that the BBO in effect when recording starts is recorded
+        self._recorded_bbo: Tuple[Optional[float], int, Optional[float], int] = (
+            None,
+            0,
+            None,
+            0,
+        )
+
+    def _insert_order(self, order: Order) -> None:
+        self.orders[order.order_ref_number] = order
+        if order.buy_sell_indicator == "B":
+            key, levels, side = -order.price, self.buy_levels, 0
+        else:
+            key, levels, side = order.price, self.sell_levels, 1
+        level = levels.get(key)
+        if level is None:
+            levels[key] = [order.shares, 1]
+            best = self._best[side]
+            if best is not None and key < best:
+                self._best[side] = key
+        else:
+            level[0] += order.shares
+            level[1] += 1
+
+    def _pop_order(self, order_ref_number: int) -> Order:
+        order = self.orders.pop(order_ref_number)
+        if order.buy_sell_indicator == "B":
+            key, levels, side = -order.price, self.buy_levels, 0
+        else:
+            key, levels, side = order.price, self.sell_levels, 1
+        level = levels[key]
+        if level[1] == 1:
+            del levels[key]
+            if key == self._best[side]:
+                self._best[side] = None
+        else:
+            level[0] -= order.shares
+            level[1] -= 1
+        return order
+
+    def _update_shares(self, order: Order, new_shares: int) -> None:
+        if order.buy_sell_indicator == "B":
+            self.buy_levels[-order.price][0] += new_shares - order.shares
+        else:
+            self.sell_levels[order.price][0] += new_shares - order.shares
+        order.update_order(None, new_shares, None)
+
+    def bbo(self) -> Tuple[Optional[float], int, Optional[float], int]:
+        """
+        Gets the best bid and offer, repairing the best level of a side if it emptied.
+
+        Returns:
+        Tuple[Optional[float], int, Optional[float], int]: Best bid price and shares, and best
+        ask price and shares, with None prices for an empty side.
+        """
+        best_buy, best_sell = self._best
+        if best_buy is None and self.buy_levels:
+            best_buy = self._best[0] = min(self.buy_levels)
+        if best_sell is None and self.sell_levels:
+            best_sell = self._best[1] = min(self.sell_levels)
+        return (
+            None if best_buy is None else -best_buy,
+            0 if best_buy is None else self.buy_levels[best_buy][0],
+            best_sell,
+            0 if best_sell is None else self.sell_levels[best_sell][0],
+        )
+
+    def record_state(self, timestamp: int) -> None:
+        """
+        Records the best bid and offer at a specified timestamp if they changed since the
+        last recorded state, and passes a change since the last message to the on_bbo_change
+        subscribers. Nothing is recorded while the book's recording attribute is False, so the
+        first message once it is True records the BBO then in effect.
+
+        Parameters:
+        timestamp (int): Timestamp of the message.
+        """
+        bbo = self.bbo()
+        if bbo != self._bbo:
+            self._bbo = bbo
+            if self._on_bbo_change:
+                for callback in self._on_bbo_change:
+                    callback(timestamp, *bbo)
+        if self.recording and bbo != self._recorded_bbo:
+            self._recorded_bbo = bbo
+            bid, bid_shares, ask, ask_shares = bbo
+            self._append_state(
+                timestamp,
+                [] if bid is None else [(bid, bid_shares)],
+                [] if ask is None else [(ask, ask_shares)],
+            )
+
+    def _ladder_side(
+        self, levels: Dict[float, List[int]], depth: Optional[int], sign: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return super()._ladder_side(SortedDict(levels), depth, sign)
+
+    def level_orders(self, buy_sell_indicator: str, price: float) -> np.ndarray:
+        """
+        Builds the L3 view of a price level by a scan of the orders, ordered by timestamp and
+        then reference number.
+
+        Parameters:
+        buy_sell_indicator (str): Side of the level, 'B' for buy and 'S' for sell.
+        price (float): Price of the level, in ticks if the book uses integer prices.
+
+        Returns:
+        np.ndarray: The orders, of LEVEL_ORDER_DTYPE, first in priority first.
+        """
+        orders = sorted(
+            (order.timestamp, order.order_ref_number, order.shares)
+            for order in self.orders.values()
+            if order.buy_sell_indicator == buy_sell_indicator and order.price == price
+        )
+        level = np.empty(len(orders), dtype=LEVEL_ORDER_DTYPE)
+        level["timestamp"] = [order[0] for order in orders]
+        level["order_ref_number"] = [order[1] for order in orders]
+        level["shares"] = [order[2] for order in orders]
+        return level
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import synthetic_day
+from reconstruct import reconstruct_orderbook
+
+# Messages/sec when reconstructing every symbol of a file, with full order books recording
+# their best level after every message against BBO books recording the BBO changes.
+# Run from the repository root with: python -m benchmarks.bench_bbo
+
+
+def main(n_messages: int = 1_000_000, n_symbols: int = 100) -> None:
+    symbols = [f"S{i}" for i in range(n_symbols)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "synthetic.itch")
+        with open(path, "wb") as file:
+            file.write(synthetic_day(n_messages, symbols=symbols))
+
+        print(f"{n_messages:,} messages, {n_symbols} symbols")
+        print(f"{'':<32}{'messages/s':>14}")
+        for label, options in (
+            ("order books, depth 1", {"depth": 1}),
+            ("order books, unchanged skipped", {"depth": 1, "skip_unchanged": True}),
+            ("BBO books", {"bbo_only": True}),
+        ):
+            start = time.perf_counter()
+            reconstruct_orderbook(
+                path,
+                set(symbols),
+                use_mmap=True,
+                integer_prices=True,
+                show_progress=False,
+                **options,
+            )
+            rate = n_messages / (time.perf_counter() - start)
+            print(f"{label:<32}{rate:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+from typing import Set
+
+import parse_itch5 as itch
+from benchmarks.synthetic import synthetic_day
+from itch_reader import iter_message_offsets, map_file
+from reconstruct import reconstruct_orderbook
+
+# Messages/sec when reconstructing a few symbols out of many, with the stock locate peeked
+# before decoding against the previous loop, which decoded every order book message before
+# checking its stock.
+# Run from the repository root with: python -m benchmarks.bench_filter
+
+
+def _decode_then_filter(path: str, selected_stocks: Set[int]) -> int:
+    # The previous loop, without the order book updates of the selected stocks
+    decoders = {
+        message_type: spec.decoder for message_type, spec in itch.MESSAGE_SPECS.items()
+    }
+    selected = 0
+    with map_file(path) as mapped:
+        for message_type, offset in iter_message_offsets(mapped):
+            decoder = decoders.get(message_type)
+            if decoder is not None:
+                m = decoder(mapped, offset)
+                if m[0] in selected_stocks:
+                    selected += 1
+    return selected
+
+
+def _peek_then_filter(path: str, selected_stocks: Set[int]) -> int:
+    decoders = {
+        message_type: spec.decoder for message_type, spec in itch.MESSAGE_SPECS.items()
+    }
+    selected = 0
+    with map_file(path) as mapped:
+        for message_type, offset in iter_message_offsets(mapped):
+            decoder = decoders.get(message_type)
+            if decoder is not None and (
+                ((mapped[offset] << 8) | mapped[offset + 1]) in selected_stocks
+            ):
+                decoder(mapped, offset)
+                selected += 1
+    return selected
+
+
+def _rate(function, n_messages: int) -> float:
+    start = time.perf_counter()
+    function()
+    return n_messages / (time.perf_counter() - start)
+
+
+def main(n_messages: int = 1_000_000, n_symbols: int = 2000) -> None:
+    symbols = [f"S{i}" for i in range(n_symbols)]
+    # The selected stocks, with locates 1 to 3
+    selected_symbols = set(symbols[:3])
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "synthetic.itch")
+        with open(path, "wb") as file:
+            file.write(synthetic_day(n_messages, symbols=symbols))
+
+        print(
+            f"{n_messages:,} messages, {len(selected_symbols)} of {n_symbols} symbols"
+        )
+        print(f"{'':<28}{'messages/s':>14}")
+        for label, function in (
+            ("decode, then filter", lambda: _decode_then_filter(path, {1, 2, 3})),
+            ("peek locate, then decode", lambda: _peek_then_filter(path, {1, 2, 3})),
+            (
+                "reconstruct_orderbook",
+                lambda: reconstruct_orderbook(
+                    path, selected_symbols, use_mmap=True, show_progress=False
+                ),
+            ),
+        ):
+            print(f"{label:<28}{_rate(function, n_messages):>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
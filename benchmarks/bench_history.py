@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import synthetic_day
+from delta_history import DeltaHistory
+from reconstruct import reconstruct_orderbook
+
+# Size on disk of an order book history in the CSV, Parquet and delta formats, and time to
+# read it back, at increasing depths.
+# Run from the repository root with: python -m benchmarks.bench_history
+
+
+def _file_size(directory: str, symbol: str, extension: str) -> int:
+    return os.path.getsize(
+        f"{directory}/{symbol}/{symbol}_order_book_history.{extension}"
+    )
+
+
+def main(n_messages: int = 100_000, depths=(5, 20, 50)) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "synthetic.itch")
+        with open(path, "wb") as file:
+            file.write(synthetic_day(n_messages, symbols=("AAPL",)))
+
+        print(f"{n_messages:,} messages")
+        print(
+            f"{'depth':<8}{'CSV (B)':>14}{'Parquet (B)':>14}{'delta (B)':>14}"
+            f"{'CSV/delta':>12}{'delta read (s)':>16}"
+        )
+        for depth in depths:
+            book = reconstruct_orderbook(path, {"AAPL"}, depth, integer_prices=True)[1]
+            book.export_to_csv(directory)
+            book.export_to_parquet(directory)
+            book.export_to_delta(directory)
+            csv_size = _file_size(directory, "AAPL", "csv")
+            parquet_size = _file_size(directory, "AAPL", "parquet")
+            delta_size = _file_size(directory, "AAPL", "delta")
+
+            start = time.perf_counter()
+            DeltaHistory(f"{directory}/AAPL/AAPL_order_book_history.delta").read()
+            elapsed = time.perf_counter() - start
+            print(
+                f"{depth:<8}{csv_size:>14,}{parquet_size:>14,}{delta_size:>14,}"
+                f"{csv_size / delta_size:>12.1f}{elapsed:>16.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
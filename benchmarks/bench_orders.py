@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import random
+import time
+import tracemalloc
+from typing import Callable, List, Optional
+
+from order_store import ArrayOrderStore
+from orderbook import Order, OrderBook
+
+# Memory per live order and add/remove throughput of the order book, for the slotted Order
+# against the previous __dict__-based order class, and for the array-backed order store.
+# Run from the repository root with: python -m benchmarks.bench_orders
+
+
+class LegacyOrder:
+    # The previous Order, with a per-instance __dict__
+    def __init__(self, timestamp, order_ref_number, buy_sell_indicator, shares, price):
+        self.timestamp = timestamp
+        self.order_ref_number = order_ref_number
+        self.buy_sell_indicator = buy_sell_indicator
+        self.shares = shares
+        self.price = price
+
+    def update_order(
+        self,
+        new_timestamp: Optional[int] = None,
+        new_shares: Optional[int] = None,
+        new_price: Optional[float] = None,
+    ) -> None:
+        if new_timestamp is not None:
+            self.timestamp = new_timestamp
+        if new_shares is not None:
+            self.shares = new_shares
+        if new_price is not None:
+            self.price = new_price
+
+
+def _make_orders(
+    order_class: Callable[..., object], n_orders: int, seed: int = 0
+) -> List:
+    """
+    Builds orders with realistic fields: increasing timestamps and references, prices near a mid.
+
+    Parameters:
+    order_class (Callable[..., object]): Class of the orders to build.
+    n_orders (int): Number of orders.
+    seed (int): Seed of the random number generator.
+
+    Returns:
+    List: The orders.
+    """
+    rnd = random.Random(seed)
+    timestamp = 34_200_000_000_000
+    orders = []
+    for ref in range(1, n_orders + 1):
+        timestamp += rnd.randint(1, 100_000)
+        side = "B" if rnd.random() < 0.5 else "S"
+        level = rnd.randint(0, 200) * 100
+        price = 1_000_000 - level if side == "B" else 1_000_100 + level
+        orders.append(
+            order_class(timestamp, ref, side, rnd.randint(1, 10) * 100, price)
+        )
+    return orders
+
+
+def _bytes_per_order(build: Callable[[], object], n_orders: int) -> float:
+    """
+    Measures the memory allocated by build, per order.
+
+    Parameters:
+    build (Callable[[], object]): Builds and returns the structure to measure.
+    n_orders (int): Number of orders held by the structure.
+
+    Returns:
+    float: Bytes allocated per order.
+    """
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    kept = build()  # noqa: F841, kept alive while measuring
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    return size / n_orders
+
+
+def _new_book(array_store: bool) -> OrderBook:
+    order_store = ArrayOrderStore().view(1) if array_store else None
+    return OrderBook("BENCH", depth=5, integer_prices=True, order_store=order_store)
+
+
+def _fill_book(orders: List, array_store: bool = False) -> OrderBook:
+    book = _new_book(array_store)
+    for order in orders:
+        book.add_order(order)
+    return book
+
+
+def _throughput(
+    order_class: Callable[..., object], n_orders: int, array_store: bool = False
+) -> float:
+    """
+    Measures add and remove operations per second on an order book.
+
+    Parameters:
+    order_class (Callable[..., object]): Class of the orders to add.
+    n_orders (int): Number of orders added then removed.
+    array_store (bool): If True, the book keeps its orders in an ArrayOrderStore.
+
+    Returns:
+    float: Operations (adds plus removes) per second.
+    """
+    fields = [
+        (o.timestamp, o.order_ref_number, o.buy_sell_indicator, o.shares, o.price)
+        for o in _make_orders(order_class, n_orders)
+    ]
+    book = _new_book(array_store)
+    start = time.perf_counter()
+    for values in fields:
+        book.add_order(order_class(*values))
+    for values in fields:
+        book.remove_order(values[1])
+    return 2 * n_orders / (time.perf_counter() - start)
+
+
+def main(n_orders: int = 200_000) -> None:
+    print(f"{n_orders:,} live orders")
+    print(f"{'':<14}{'order (B)':>12}{'in book (B)':>14}{'add+remove (op/s)':>20}")
+    for label, order_class in (("__dict__", LegacyOrder), ("__slots__", Order)):
+        order_bytes = _bytes_per_order(
+            lambda: _make_orders(order_class, n_orders), n_orders
+        )
+        book_bytes = _bytes_per_order(
+            lambda: _fill_book(_make_orders(order_class, n_orders)), n_orders
+        )
+        rate = _throughput(order_class, n_orders)
+        print(f"{label:<14}{order_bytes:>12.0f}{book_bytes:>14.0f}{rate:>20,.0f}")
+
+    # The orders are only materialized while being added, the store keeps columns
+    orders = _make_orders(Order, n_orders)
+    book_bytes = _bytes_per_order(
+        lambda: _fill_book(orders, array_store=True), n_orders
+    )
+    rate = _throughput(Order, n_orders, array_store=True)
+    print(f"{'array store':<14}{'-':>12}{book_bytes:>14.0f}{rate:>20,.0f}")
+
+
+if __name__ == "__main__":
+    main()
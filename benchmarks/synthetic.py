@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import random
+import struct
+from typing import Dict, List, Sequence, Tuple
+
+import parse_itch5 as itch
+
+# Synthetic ITCH 5.0 data for the benchmarks, so they can run without a NASDAQ file
+
+START_TIMESTAMP = 4 * 3600 * 10**9  # 04:00 in nanoseconds since midnight
+
+
+def _pack(message_type: bytes, *values) -> bytes:
+    """
+    Packs a message body with the registered layout of its type, splitting the timestamp.
+
+    Parameters:
+    message_type (bytes): Type of the message, a key of parse_itch5.MESSAGE_SPECS.
+    values: Field values in the order of the message specification, with a single timestamp.
+
+    Returns:
+    bytes: The message type followed by the message body.
+    """
+    layout = itch.MESSAGE_SPECS[message_type].layout
+    if message_type == b"R":
+        timestamp = values[2].to_bytes(6, byteorder="big")
+        return message_type + layout.pack(*values[:2], timestamp, *values[3:])
+    timestamp = values[2]
+    return message_type + layout.pack(
+        *values[:2], timestamp >> 32, timestamp & 0xFFFFFFFF, *values[3:]
+    )
+
+
+def _frame(message: bytes) -> bytes:
+    return struct.pack("!H", len(message)) + message
+
+
+def _stock(symbol: str) -> bytes:
+    return symbol.ljust(8).encode()
+
+
+def sample_bodies(timestamp: int = START_TIMESTAMP) -> Dict[bytes, bytes]:
+    """
+    Builds one message body (without the message type) for every parsed message type.
+
+    Parameters:
+    timestamp (int): Timestamp of the messages.
+
+    Returns:
+    Dict[bytes, bytes]: Message bodies keyed by message type.
+    """
+    stock = _stock("MSFT")
+    messages = [
+        _pack(b"R", 1, 0, timestamp, stock, b"Q", b"N", 100, b"N", b"C", b"Z ", b"P", b"N", b"N", b"1", b"N", 0, b"N"),
+        _pack(b"A", 1, 0, timestamp, 7, b"B", 100, stock, 1052500),
+        _pack(b"F", 1, 0, timestamp, 7, b"S", 100, stock, 1052500, b"MPID"),
+        _pack(b"E", 1, 0, timestamp, 7, 50, 11),
+        _pack(b"C", 1, 0, timestamp, 7, 50, 11, b"Y", 1052600),
+        _pack(b"X", 1, 0, timestamp, 7, 25),
+        _pack(b"D", 1, 0, timestamp, 7),
+        _pack(b"U", 1, 0, timestamp, 7, 8, 200, 1052400),
+        _pack(b"P", 1, 0, timestamp, 0, b"B", 300, stock, 1052500, 12),
+        _pack(b"Q", 1, 0, timestamp, 5000, stock, 1052500, 13, b"O"),
+    ]  # fmt: skip
+    return {message[:1]: message[1:] for message in messages}
+
+
+def synthetic_day(
+    n_messages: int,
+    symbols: Sequence[str] = ("AAPL", "MSFT", "GOOGL"),
+    seed: int = 0,
+    base_price: int = 1_000_000,
+) -> bytes:
+    """
+    Builds a consistent stream of framed ITCH messages for a set of symbols.
+
+    The stream starts with a stock directory message per symbol, followed by random add,
+    execute, cancel, delete, replace and trade messages against live orders, with prices
+    clustered around a fixed mid so that books have deep, busy levels.
+
+    Parameters:
+    n_messages (int): Number of order book messages to generate.
+    symbols (Sequence[str]): Symbols to generate messages for; their locates are 1, 2, ...
+    seed (int): Seed of the random number generator.
+    base_price (int): Best bid the prices cluster under, in integer ticks; the asks start a
+        cent above it.
+
+    Returns:
+    bytes: The file contents, with every message framed by its 2-byte length prefix.
+    """
+    rnd = random.Random(seed)
+    timestamp = START_TIMESTAMP
+    messages = []
+    for locate, symbol in enumerate(symbols, 1):
+        messages.append(
+            _pack(b"R", locate, 0, timestamp, _stock(symbol), b"Q", b"N", 100, b"N", b"C", b"Z ", b"P", b"N", b"N", b"1", b"N", 0, b"N")
+        )  # fmt: skip
+    # Live orders per locate, as lists of (reference number, side, shares, price)
+    live: Dict[int, List[Tuple[int, bytes, int, int]]] = {
+        locate: [] for locate in range(1, len(symbols) + 1)
+    }
+    next_ref = 1
+    for match in range(n_messages):
+        timestamp += rnd.randint(1, 1_000_000)
+        locate = rnd.randint(1, len(symbols))
+        orders = live[locate]
+        r = rnd.random()
+        if r < 0.4 or not orders:
+            side = b"B" if rnd.random() < 0.5 else b"S"
+            level = rnd.randint(0, 40) * 100
+            price = base_price - level if side == b"B" else base_price + 100 + level
+            shares = rnd.randint(1, 10) * 100
+            messages.append(
+                _pack(b"A", locate, 0, timestamp, next_ref, side, shares, _stock(symbols[locate - 1]), price)
+            )  # fmt: skip
+            orders.append((next_ref, side, shares, price))
+            next_ref += 1
+            continue
+        index = rnd.randrange(len(orders))
+        ref, side, shares, price = orders[index]
+        if r < 0.55:
+            executed = rnd.randint(1, shares)
+            messages.append(_pack(b"E", locate, 0, timestamp, ref, executed, match))
+            if executed == shares:
+                orders[index] = orders[-1]
+                orders.pop()
+            else:
+                orders[index] = (ref, side, shares - executed, price)
+        elif r < 0.7 and shares > 1:
+            cancelled = rnd.randint(1, shares - 1)
+            messages.append(_pack(b"X", locate, 0, timestamp, ref, cancelled))
+            orders[index] = (ref, side, shares - cancelled, price)
+        elif r < 0.85:
+            messages.append(_pack(b"D", locate, 0, timestamp, ref))
+            orders[index] = orders[-1]
+            orders.pop()
+        elif r < 0.95:
+            new_shares = rnd.randint(1, 10) * 100
+            messages.append(
+                _pack(b"U", locate, 0, timestamp, ref, next_ref, new_shares, price)
+            )
+            orders[index] = (next_ref, side, new_shares, price)
+            next_ref += 1
+        else:
+            messages.append(
+                _pack(b"P", locate, 0, timestamp, 0, b"B", 100, _stock(symbols[locate - 1]), price, match)
+            )  # fmt: skip
+    return b"".join(_frame(message) for message in messages)
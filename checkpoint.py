@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import os
+import re
+import struct
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from order_store import ArrayOrderStore, LocateOrders
+from orderbook import Order, OrderBook
+from parse_itch5 import PRICE_SCALE
+
+# File layout, all little-endian:
+#   header: magic, size of the ITCH file, file offset to resume from, timestamp, number of
+#       books, size of the selected symbols
+#   selected symbols: the symbols selected by the reconstruction, separated by newlines
+#   per book: stock locate, symbol (8 bytes), number of orders, then the orders
+# The sorted order queues and price level aggregates of a book are rebuilt from its orders,
+# so they are not stored.
+MAGIC = b"ITCHCKP1"
+_HEADER = struct.Struct("<8sQQQII")
+_BOOK = struct.Struct("<H8sQ")
+ORDER_DTYPE = np.dtype(
+    [
+        ("order_ref_number", "<u8"),
+        ("timestamp", "<i8"),
+        ("buy_sell_indicator", "S1"),
+        ("shares", "<u4"),
+        ("price", "<u4"),
+    ]
+)
+_FILE_NAME = re.compile(r"checkpoint_(\d+)\.ckpt$")
+
+
+class Checkpoint(NamedTuple):
+    """
+    State of a reconstruction at a point of an ITCH file.
+
+    Attributes:
+    file_size (int): Size of the ITCH file.
+    file_offset (int): Position of the length prefix of the first message not yet processed.
+    timestamp (int): Timestamp of that message, in nanoseconds since midnight.
+    symbols (Set[str]): Symbols selected by the reconstruction, which may not all have a book.
+    orders (Dict[int, Tuple[str, np.ndarray]]): Symbol and live orders (of ORDER_DTYPE, with
+        prices in integer ticks) of each order book, keyed by stock locate number.
+    """
+
+    file_size: int
+    file_offset: int
+    timestamp: int
+    symbols: Set[str]
+    orders: Dict[int, Tuple[str, np.ndarray]]
+
+
+def checkpoint_path(directory: str, timestamp: int) -> str:
+    return os.path.join(directory, f"checkpoint_{timestamp:015d}.ckpt")
+
+
+def book_orders(book: OrderBook) -> np.ndarray:
+    """
+    Gathers the live orders of a book, with prices in integer ticks.
+
+    Parameters:
+    book (OrderBook): The order book.
+
+    Returns:
+    np.ndarray: The orders, of ORDER_DTYPE.
+    """
+    orders = [book.orders[ref] for ref in book.orders]
+    array = np.empty(len(orders), dtype=ORDER_DTYPE)
+    array["order_ref_number"] = [order.order_ref_number for order in orders]
+    array["timestamp"] = [order.timestamp for order in orders]
+    array["buy_sell_indicator"] = [order.buy_sell_indicator for order in orders]
+    array["shares"] = [order.shares for order in orders]
+    prices = np.array([order.price for order in orders], dtype=np.float64)
+    if not book.integer_prices:
+        prices = np.rint(prices * PRICE_SCALE)
+    array["price"] = prices
+    return array
+
+
+def _store_orders(store: ArrayOrderStore, refs: np.ndarray) -> np.ndarray:
+    """
+    Gathers orders from the columns of an order store.
+
+    Parameters:
+    store (ArrayOrderStore): The order store.
+    refs (np.ndarray): Reference numbers of live orders of the store.
+
+    Returns:
+    np.ndarray: The orders, of ORDER_DTYPE.
+    """
+    array = np.empty(len(refs), dtype=ORDER_DTYPE)
+    array["order_ref_number"] = refs
+    array["timestamp"] = np.frombuffer(store.timestamps, dtype=np.int64)[refs]
+    array["buy_sell_indicator"] = np.frombuffer(store.sides, dtype="S1")[refs]
+    array["shares"] = np.frombuffer(store.shares, dtype=np.uint32)[refs]
+    array["price"] = np.frombuffer(store.prices, dtype=np.uint32)[refs]
+    return array
+
+
+def books_orders(books: Dict[int, OrderBook]) -> Dict[int, np.ndarray]:
+    """
+    Gathers the live orders of order books, with prices in integer ticks.
+
+    The books whose orders are kept in a shared ArrayOrderStore are gathered with a single
+    scan of the store, instead of one scan of the whole store per book.
+
+    Parameters:
+    books (Dict[int, OrderBook]): Order books keyed by stock locate number.
+
+    Returns:
+    Dict[int, np.ndarray]: The orders of each book, of ORDER_DTYPE, keyed like books.
+    """
+    orders = {}
+    stores = {}
+    for locate, book in books.items():
+        if isinstance(book.orders, LocateOrders):
+            stores[id(book.orders.store)] = book.orders.store
+        else:
+            orders[locate] = book_orders(book)
+    for store in stores.values():
+        store_refs = store.locate_order_ref_numbers()
+        no_refs = np.empty(0, dtype=np.int64)
+        for locate, book in books.items():
+            if isinstance(book.orders, LocateOrders) and book.orders.store is store:
+                refs = store_refs.get(book.orders.stock_locate, no_refs)
+                orders[locate] = _store_orders(store, refs)
+    return orders
+
+
+def restore_orders(book: OrderBook, orders: np.ndarray) -> None:
+    """
+    Adds checkpointed orders to an empty book, rebuilding its sorted orders and levels.
+
+    Parameters:
+    book (OrderBook): The order book.
+    orders (np.ndarray): The orders, of ORDER_DTYPE.
+    """
+    prices = orders["price"].tolist()
+    if not book.integer_prices:
+        prices = [price / PRICE_SCALE for price in prices]
+    for ref, timestamp, side, shares, price in zip(
+        orders["order_ref_number"].tolist(),
+        orders["timestamp"].tolist(),
+        orders["buy_sell_indicator"].tolist(),
+        orders["shares"].tolist(),
+        prices,
+    ):
+        book.add_order(Order(timestamp, ref, side.decode(), shares, price))
+
+
+def write_checkpoint(
+    path: str,
+    books: Dict[int, OrderBook],
+    symbols: Iterable[str],
+    file_size: int,
+    file_offset: int,
+    timestamp: int,
+) -> None:
+    """
+    Writes the live orders of order books along with the position reached in the ITCH file.
+
+    Parameters:
+    path (str): Path of the checkpoint.
+    books (Dict[int, OrderBook]): Order books keyed by stock locate number.
+    symbols (Iterable[str]): Symbols selected by the reconstruction.
+    file_size (int): Size of the ITCH file.
+    file_offset (int): Position of the length prefix of the first message not yet processed.
+    timestamp (int): Timestamp of that message.
+    """
+    # Written next to the final path and renamed, so that a crash leaves no partial checkpoint
+    partial = f"{path}.partial"
+    symbols = "\n".join(sorted(symbols)).encode()
+    with open(partial, "wb") as file:
+        file.write(
+            _HEADER.pack(
+                MAGIC, file_size, file_offset, timestamp, len(books), len(symbols)
+            )
+        )
+        file.write(symbols)
+        orders_of = books_orders(books)
+        for locate, book in books.items():
+            orders = orders_of[locate]
+            symbol = book.stock_symbol.encode().ljust(8)
+            file.write(_BOOK.pack(locate, symbol, len(orders)))
+            file.write(orders.tobytes())
+    os.replace(partial, path)
+
+
+def read_checkpoint(path: str) -> Checkpoint:
+    """
+    Reads a checkpoint written by write_checkpoint.
+
+    Parameters:
+    path (str): Path of the checkpoint.
+
+    Returns:
+    Checkpoint: The checkpointed state.
+
+    Raises:
+    ValueError: If the file is not a checkpoint.
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    if len(data) < _HEADER.size or data[:8] != MAGIC:
+        raise ValueError(f"{path} is not a checkpoint.")
+    _, file_size, file_offset, timestamp, n_books, symbols_size = _HEADER.unpack_from(
+        data
+    )
+    position = _HEADER.size + symbols_size
+    symbols = set(data[_HEADER.size : position].decode().split("\n")) - {""}
+    orders = {}
+    for _ in range(n_books):
+        locate, symbol, n_orders = _BOOK.unpack_from(data, position)
+        position += _BOOK.size
+        orders[locate] = (
+            symbol.decode().strip(),
+            np.frombuffer(data, ORDER_DTYPE, n_orders, position),
+        )
+        position += n_orders * ORDER_DTYPE.itemsize
+    return Checkpoint(file_size, file_offset, timestamp, symbols, orders)
+
+
+def list_checkpoints(directory: str) -> List[Tuple[int, str]]:
+    """
+    Lists the checkpoints of a directory.
+
+    Parameters:
+    directory (str): Directory of the checkpoints.
+
+    Returns:
+    List[Tuple[int, str]]: Timestamp and path of each checkpoint, in time order.
+    """
+    if not os.path.isdir(directory):
+        return []
+    checkpoints = []
+    for name in os.listdir(directory):
+        match = _FILE_NAME.match(name)
+        if match:
+            checkpoints.append((int(match.group(1)), os.path.join(directory, name)))
+    return sorted(checkpoints)
+
+
+def find_checkpoint(
+    directory: str, symbols: set, timestamp: Optional[int] = None
+) -> Optional[Checkpoint]:
+    """
+    Finds the latest checkpoint of a reconstruction which selected symbols, at or before a time.
+
+    Parameters:
+    directory (str): Directory of the checkpoints.
+    symbols (set): Symbols which must have been selected by the checkpointed reconstruction.
+    timestamp (int, optional): Latest time of the checkpoint, in nanoseconds since midnight.
+
+    Returns:
+    Optional[Checkpoint]: The checkpoint, or None if there is none.
+    """
+    for checkpoint_timestamp, path in reversed(list_checkpoints(directory)):
+        if timestamp is not None and checkpoint_timestamp > timestamp:
+            continue
+        checkpoint = read_checkpoint(path)
+        if symbols <= checkpoint.symbols:
+            return checkpoint
+    return None
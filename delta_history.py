@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import struct
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from history import history_header
+from parse_itch5 import PRICE_SCALE
+
+# File layout, all little-endian:
+#   header: magic, depth, keyframe interval, number of rows, number of deltas
+#   timestamps: int64 per row
+#   delta counts: uint16 per row, number of deltas of each row
+#   keyframe delta starts: int64 per keyframe, position of the first delta after each keyframe
+#   keyframe prices: uint32 ticks per keyframe and level column
+#   keyframe shares: uint32 per keyframe and level column
+#   deltas: (column, price, shares) per changed level
+# Level columns are the buy levels, best first, followed by the sell levels, so the column
+# of a delta encodes both its side and its level index. Missing levels have 0 price and shares.
+MAGIC = b"ITCHDLT1"
+_HEADER = struct.Struct("<8sIIQQ")
+DELTA_DTYPE = np.dtype([("column", "<u2"), ("price", "<u4"), ("shares", "<u4")])
+
+# Number of rows between full keyframes
+DEFAULT_KEYFRAME_INTERVAL = 1024
+
+
+class HistoryLevels(NamedTuple):
+    timestamps: np.ndarray
+    buy_prices: np.ndarray
+    buy_shares: np.ndarray
+    sell_prices: np.ndarray
+    sell_shares: np.ndarray
+
+
+def write_delta_history(
+    path: str,
+    timestamps: np.ndarray,
+    prices: np.ndarray,
+    shares: np.ndarray,
+    keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL,
+) -> None:
+    """
+    Writes an order book history in the delta format.
+
+    Every keyframe_interval-th row is stored in full, and every other row as the levels
+    which differ from the previous row, which is usually one or two.
+
+    Parameters:
+    path (str): Path of the file to write.
+    timestamps (np.ndarray): Timestamp of each row.
+    prices (np.ndarray): Prices of each row in integer ticks, with shape (rows, 2 * depth):
+        the buy levels followed by the sell levels, 0 for missing levels.
+    shares (np.ndarray): Shares of each row, with the shape of prices.
+    keyframe_interval (int): Number of rows between keyframes.
+    """
+    n_rows, n_columns = prices.shape
+    timestamps = np.asarray(timestamps, dtype="<i8")
+    prices = np.asarray(prices, dtype="<u4")
+    shares = np.asarray(shares, dtype="<u4")
+
+    changed = (prices[1:] != prices[:-1]) | (shares[1:] != shares[:-1])
+    # Keyframe rows are stored in full, not as changes
+    changed[keyframe_interval - 1 :: keyframe_interval] = False
+    rows, columns = np.nonzero(changed)
+    rows += 1
+    deltas = np.empty(len(rows), dtype=DELTA_DTYPE)
+    deltas["column"] = columns
+    deltas["price"] = prices[rows, columns]
+    deltas["shares"] = shares[rows, columns]
+    delta_counts = np.bincount(rows, minlength=n_rows).astype("<u2")
+    # Deltas of the rows before each keyframe
+    delta_starts = np.zeros(n_rows + 1, dtype="<i8")
+    np.cumsum(delta_counts, out=delta_starts[1:])
+    keyframe_delta_starts = delta_starts[:n_rows:keyframe_interval]
+
+    with open(path, "wb") as file:
+        file.write(
+            _HEADER.pack(MAGIC, n_columns // 2, keyframe_interval, n_rows, len(deltas))
+        )
+        for array in (
+            timestamps,
+            delta_counts,
+            keyframe_delta_starts,
+            prices[::keyframe_interval],
+            shares[::keyframe_interval],
+            deltas,
+        ):
+            file.write(array.tobytes())
+
+
+class DeltaHistory:
+    def __init__(self, path: str) -> None:
+        """
+        Opens an order book history in the delta format, memory-mapped so that only the rows
+        which are read are loaded.
+
+        Parameters:
+        path (str): Path of the file written by write_delta_history.
+
+        Raises:
+        ValueError: If the file is not in the delta format.
+        """
+        data = np.memmap(path, dtype=np.uint8, mode="r")
+        if len(data) < _HEADER.size:
+            raise ValueError(f"{path} is not an order book delta history.")
+        magic, self.depth, self.keyframe_interval, n_rows, n_deltas = (
+            _HEADER.unpack_from(data)
+        )
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an order book delta history.")
+        n_columns = 2 * self.depth
+        n_keyframes = -(-n_rows // self.keyframe_interval)
+
+        offset = _HEADER.size
+
+        def section(dtype, count, shape=None):
+            nonlocal offset
+            size = np.dtype(dtype).itemsize * count
+            array = data[offset : offset + size].view(dtype)
+            offset += size
+            return array if shape is None else array.reshape(shape)
+
+        self.timestamps = section("<i8", n_rows)
+        self._delta_counts = section("<u2", n_rows)
+        self._keyframe_delta_starts = section("<i8", n_keyframes)
+        self._keyframe_prices = section(
+            "<u4", n_keyframes * n_columns, (n_keyframes, n_columns)
+        )
+        self._keyframe_shares = section(
+            "<u4", n_keyframes * n_columns, (n_keyframes, n_columns)
+        )
+        self.deltas = section(DELTA_DTYPE, n_deltas)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def row_at(self, timestamp: int) -> int:
+        """
+        Finds the state in effect at a time, by binary search of the timestamps.
+
+        Parameters:
+        timestamp (int): Nanoseconds since midnight.
+
+        Returns:
+        int: Row of the last state recorded at or before timestamp, -1 if there is none.
+        """
+        return int(np.searchsorted(self.timestamps, timestamp, side="right")) - 1
+
+    def rows_between(self, start_time: int, end_time: int) -> slice:
+        """
+        Finds the states recorded during a time interval, by binary search of the timestamps.
+
+        Parameters:
+        start_time (int): Start of the interval, in nanoseconds since midnight.
+        end_time (int): End of the interval, included.
+
+        Returns:
+        slice: Rows of the states.
+        """
+        return slice(
+            int(np.searchsorted(self.timestamps, start_time, side="left")),
+            int(np.searchsorted(self.timestamps, end_time, side="right")),
+        )
+
+    def read(self, start: int = 0, stop: Optional[int] = None) -> HistoryLevels:
+        """
+        Reconstructs a range of rows.
+
+        Decoding starts at the keyframe preceding start. The keyframe and the deltas are
+        scattered into the rows they belong to, and each column is carried forward from the
+        last row which set it, all in vectorized passes.
+
+        Parameters:
+        start (int): First row.
+        stop (int, optional): Row after the last, the end of the history by default.
+
+        Returns:
+        HistoryLevels: Timestamps, and prices (in integer ticks, 0 for missing levels) and
+        shares of the levels of each side, with shape (rows, depth).
+        """
+        start, stop, _ = slice(start, stop).indices(len(self))
+        stop = max(start, stop)
+        interval = self.keyframe_interval
+        first = start - start % interval
+        n_rows = stop - first
+        n_columns = 2 * self.depth
+
+        prices = np.zeros((n_rows, n_columns), dtype=np.uint32)
+        shares = np.zeros((n_rows, n_columns), dtype=np.uint32)
+        is_set = np.zeros((n_rows, n_columns), dtype=bool)
+        keyframes = slice(first // interval, -(-stop // interval))
+        prices[::interval] = self._keyframe_prices[keyframes]
+        shares[::interval] = self._keyframe_shares[keyframes]
+        is_set[::interval] = True
+
+        counts = self._delta_counts[first:stop]
+        delta_start = self._keyframe_delta_starts[first // interval] if n_rows else 0
+        deltas = self.deltas[delta_start : delta_start + counts.sum(dtype=np.int64)]
+        rows = np.repeat(np.arange(n_rows), counts)
+        columns = deltas["column"]
+        prices[rows, columns] = deltas["price"]
+        shares[rows, columns] = deltas["shares"]
+        is_set[rows, columns] = True
+
+        # Index of the last row which set each level, at or before each row
+        source = np.where(is_set, np.arange(n_rows)[:, None], 0)
+        np.maximum.accumulate(source, axis=0, out=source)
+        source = source[start - first :]
+        columns = np.arange(n_columns)
+        prices = prices[source, columns]
+        shares = shares[source, columns]
+        depth = self.depth
+        return HistoryLevels(
+            np.array(self.timestamps[start:stop]),
+            prices[:, :depth],
+            shares[:, :depth],
+            prices[:, depth:],
+            shares[:, depth:],
+        )
+
+    def to_frame(self, start: int = 0, stop: Optional[int] = None):
+        """
+        Builds a pandas DataFrame of a range of rows, with the columns of the CSV export.
+        Prices are decimal, and missing levels are NaN.
+
+        Parameters:
+        start (int): First row.
+        stop (int, optional): Row after the last, the end of the history by default.
+
+        Returns:
+        pd.DataFrame: The rows.
+        """
+        import pandas as pd
+
+        levels = self.read(start, stop)
+        columns = iter(history_header(self.depth))
+        frame = {next(columns): levels.timestamps}
+        for i in range(self.depth):
+            for prices, shares in (
+                (levels.buy_prices[:, i], levels.buy_shares[:, i]),
+                (levels.sell_prices[:, i], levels.sell_shares[:, i]),
+            ):
+                missing = prices == 0
+                frame[next(columns)] = np.where(missing, np.nan, prices / PRICE_SCALE)
+                frame[next(columns)] = np.where(missing, np.nan, shares)
+        return pd.DataFrame(frame)
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+from typing import List, Tuple
+
+import numpy as np
+from sortedcontainers import SortedDict
+
+from history import DEFAULT_CAPACITY, _grown, _next_capacity
+from parse_itch5 import PRICE_SCALE
+
+# Feature columns after the timestamp, prices are decimal and NaN while a side is empty
+FEATURE_COLUMNS = (
+    "bid_price",
+    "ask_price",
+    "spread",
+    "mid_price",
+    "microprice",
+    "imbalance",
+    "ofi",
+)
+
+_INF = float("inf")
+_NAN = float("nan")
+
+
+class FeatureEngine:
+    def __init__(
+        self,
+        levels: int = 1,
+        integer_prices: bool = False,
+        capacity: int = DEFAULT_CAPACITY,
+    ) -> None:
+        """
+        Initializes a columnar series of top of book features, updated after every message.
+
+        Each update reads the best level of both sides (and the shares of the first levels
+        for the imbalance) from the book's aggregated levels, and keeps the previous best
+        levels to compute the order flow imbalance, so no history is needed. The features
+        are written into preallocated NumPy columns, grown like BookHistory.
+
+        The features of each update are:
+        bid_price, ask_price: Best prices.
+        spread: Ask price minus bid price.
+        mid_price: Average of the bid and ask prices.
+        microprice: Bid and ask prices weighted by the shares on the opposite side.
+        imbalance: Buy shares minus sell shares over their sum, on the first levels of each side.
+        ofi: Order flow imbalance of the update (Cont, Kukanov and Stoikov), the change in
+            shares at the bid minus the change at the ask, counting a whole level when a
+            best price moves. Its cumulative sum over an interval is the interval's OFI.
+
+        Parameters:
+        levels (int): Number of levels of each side in the imbalance.
+        integer_prices (bool): If True, the book's prices are integer ticks, converted in the features.
+        capacity (int): Number of updates allocated up front.
+        """
+        if levels < 1:
+            raise ValueError("The imbalance needs at least one level.")
+        self.levels = levels
+        self._scale = 1 / PRICE_SCALE if integer_prices else 1
+        self._size = 0
+        self._timestamps = np.zeros(capacity, dtype=np.int64)
+        self._values = np.zeros((capacity, len(FEATURE_COLUMNS)), dtype=np.float64)
+        # Best levels after the previous update, a missing bid being at -inf with no shares
+        # and a missing ask at +inf, so that a side (dis)appearing counts as a price move
+        self._bid = -_INF
+        self._bid_shares = 0
+        self._ask = _INF
+        self._ask_shares = 0
+
+    def update(
+        self,
+        timestamp: int,
+        buy_levels: SortedDict,
+        sell_levels: SortedDict,
+        record: bool = True,
+    ) -> None:
+        """
+        Updates the features after a message.
+
+        Parameters:
+        timestamp (int): Timestamp of the message.
+        buy_levels (SortedDict): The book's buy levels, keyed by negated price.
+        sell_levels (SortedDict): The book's sell levels, keyed by price.
+        record (bool): If False, only the best levels are tracked, e.g. before a time window.
+        """
+        if buy_levels:
+            key, (bid_shares, _) = buy_levels.peekitem(0)
+            bid = -key
+        else:
+            bid, bid_shares = -_INF, 0
+        if sell_levels:
+            ask, (ask_shares, _) = sell_levels.peekitem(0)
+        else:
+            ask, ask_shares = _INF, 0
+
+        # Order flow at the bid: shares added at or above the previous bid, minus the shares
+        # removed at or below it, and the opposite at the ask
+        ofi = 0
+        if bid >= self._bid:
+            ofi += bid_shares
+        if bid <= self._bid:
+            ofi -= self._bid_shares
+        if ask <= self._ask:
+            ofi -= ask_shares
+        if ask >= self._ask:
+            ofi += self._ask_shares
+        self._bid, self._bid_shares, self._ask, self._ask_shares = (
+            bid,
+            bid_shares,
+            ask,
+            ask_shares,
+        )
+        if not record:
+            return
+
+        if self.levels == 1:
+            buy_depth, sell_depth = bid_shares, ask_shares
+        else:
+            buy_depth = sum(
+                [buy_levels[key][0] for key in buy_levels.islice(stop=self.levels)]
+            )
+            sell_depth = sum(
+                [sell_levels[key][0] for key in sell_levels.islice(stop=self.levels)]
+            )
+        total = buy_depth + sell_depth
+        imbalance = (buy_depth - sell_depth) / total if total else _NAN
+
+        scale = self._scale
+        if bid_shares and ask_shares:
+            bid *= scale
+            ask *= scale
+            spread = ask - bid
+            mid = (bid + ask) / 2
+            microprice = (bid * ask_shares + ask * bid_shares) / (
+                bid_shares + ask_shares
+            )
+        else:
+            bid = bid * scale if bid_shares else _NAN
+            ask = ask * scale if ask_shares else _NAN
+            spread = mid = microprice = _NAN
+
+        i = self._size
+        if i == len(self._timestamps):
+            capacity = _next_capacity(i)
+            self._timestamps = _grown(self._timestamps, capacity)
+            self._values = _grown(self._values, capacity)
+        self._timestamps[i] = timestamp
+        self._values[i] = (bid, ask, spread, mid, microprice, imbalance, ofi)
+        self._size = i + 1
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._timestamps[: self._size]
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        """
+        Gets a feature column, a view of the recorded updates.
+
+        Parameters:
+        column (str): Name of the feature, one of FEATURE_COLUMNS.
+
+        Returns:
+        np.ndarray: The feature after each update.
+        """
+        return self._values[: self._size, FEATURE_COLUMNS.index(column)]
+
+    def columns(self) -> List[Tuple[str, np.ndarray]]:
+        """
+        Gets the timestamp and feature columns, as views of the recorded updates.
+
+        Returns:
+        List[Tuple[str, np.ndarray]]: Name and values of each column.
+        """
+        return [("timestamp", self.timestamps)] + [
+            (column, self[column]) for column in FEATURE_COLUMNS
+        ]
+
+    def to_frame(self):
+        """
+        Builds a pandas DataFrame of the features.
+
+        Returns:
+        pd.DataFrame: The features, with a timestamp column.
+        """
+        import pandas as pd
+
+        return pd.DataFrame(dict(self.columns()))
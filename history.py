@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Number of rows allocated by a new buffer
+DEFAULT_CAPACITY = 1 << 12
+# Largest number of rows added at once when a buffer grows; below it, capacity doubles
+MAX_GROWTH = 1 << 20
+
+
+def _grown(array: np.ndarray, capacity: int, fill: float = 0) -> np.ndarray:
+    """
+    Copies an array into a larger one along its first axis, filling the new rows.
+
+    Parameters:
+    array (np.ndarray): Array to grow.
+    capacity (int): New number of rows.
+    fill (float): Value of the new rows.
+
+    Returns:
+    np.ndarray: The grown array.
+    """
+    grown = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+    grown[: len(array)] = array
+    return grown
+
+
+def _next_capacity(capacity: int) -> int:
+    return capacity + min(capacity, MAX_GROWTH)
+
+
+def history_header(depth: int) -> List[str]:
+    """
+    Builds the column names of an order book history.
+
+    Parameters:
+    depth (int): Number of levels recorded on each side.
+
+    Returns:
+    List[str]: The timestamp followed by the price and shares of each level, buy side first.
+    """
+    header = ["timestamp"]
+    for i in range(depth):
+        header.extend(
+            [
+                f"buy_price_{i+1}",
+                f"buy_shares_{i+1}",
+                f"sell_price_{i+1}",
+                f"sell_shares_{i+1}",
+            ]
+        )
+    return header
+
+
+class BookHistory:
+    def __init__(
+        self,
+        depth: int,
+        integer_prices: bool = True,
+        capacity: int = DEFAULT_CAPACITY,
+    ) -> None:
+        """
+        Initializes a columnar history of order book states.
+
+        States are written into preallocated NumPy columns, which grow by doubling (by at most
+        MAX_GROWTH rows at a time) when full. The columns are exposed as views of the recorded
+        rows, without copying. Missing levels have a price of 0 (NaN with floating-point prices)
+        and 0 shares.
+
+        The columns are contiguous rather than chunked, so that every accessor is a view: growing
+        copies the recorded rows into larger columns, and memory briefly holds both, up to twice
+        the size of the history. At large depths over a full day, streaming the states to a sink
+        (see sinks.py) keeps memory bounded instead.
+
+        Parameters:
+        depth (int): Number of levels recorded on each side.
+        integer_prices (bool): If True, prices are uint32 ticks, otherwise float64.
+        capacity (int): Number of states allocated up front.
+        """
+        self.depth = depth
+        self.integer_prices = integer_prices
+        self._missing_price = 0 if integer_prices else np.nan
+        price_dtype = np.uint32 if integer_prices else np.float64
+        self._size = 0
+        self._timestamps = np.zeros(capacity, dtype=np.int64)
+        self._buy_prices = np.full((capacity, depth), self._missing_price, price_dtype)
+        self._buy_shares = np.zeros((capacity, depth), dtype=np.uint32)
+        self._sell_prices = np.full((capacity, depth), self._missing_price, price_dtype)
+        self._sell_shares = np.zeros((capacity, depth), dtype=np.uint32)
+
+    def _grow(self) -> None:
+        capacity = _next_capacity(len(self._timestamps))
+        self._timestamps = _grown(self._timestamps, capacity)
+        self._buy_prices = _grown(self._buy_prices, capacity, self._missing_price)
+        self._buy_shares = _grown(self._buy_shares, capacity)
+        self._sell_prices = _grown(self._sell_prices, capacity, self._missing_price)
+        self._sell_shares = _grown(self._sell_shares, capacity)
+
+    def append_levels(
+        self,
+        timestamp: int,
+        buy_levels: Sequence[Tuple[float, int]],
+        sell_levels: Sequence[Tuple[float, int]],
+    ) -> None:
+        """
+        Records a state of the order book.
+
+        Parameters:
+        timestamp (int): Timestamp of the state.
+        buy_levels (Sequence[Tuple[float, int]]): Price and shares of the best buy levels, at most depth.
+        sell_levels (Sequence[Tuple[float, int]]): Price and shares of the best sell levels, at most depth.
+        """
+        i = self._size
+        if i == len(self._timestamps):
+            self._grow()
+        self._timestamps[i] = timestamp
+        if buy_levels:
+            prices, shares = zip(*buy_levels)
+            self._buy_prices[i, : len(prices)] = prices
+            self._buy_shares[i, : len(shares)] = shares
+        if sell_levels:
+            prices, shares = zip(*sell_levels)
+            self._sell_prices[i, : len(prices)] = prices
+            self._sell_shares[i, : len(shares)] = shares
+        self._size = i + 1
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._timestamps[: self._size]
+
+    @property
+    def buy_prices(self) -> np.ndarray:
+        return self._buy_prices[: self._size]
+
+    @property
+    def buy_shares(self) -> np.ndarray:
+        return self._buy_shares[: self._size]
+
+    @property
+    def sell_prices(self) -> np.ndarray:
+        return self._sell_prices[: self._size]
+
+    @property
+    def sell_shares(self) -> np.ndarray:
+        return self._sell_shares[: self._size]
+
+    def columns(self) -> List[Tuple[str, np.ndarray]]:
+        """
+        Lists the columns of the history in the layout of the CSV export, as views.
+
+        Returns:
+        List[Tuple[str, np.ndarray]]: Column names and values.
+        """
+        columns = [("timestamp", self.timestamps)]
+        for i in range(self.depth):
+            columns.extend(
+                [
+                    (f"buy_price_{i+1}", self.buy_prices[:, i]),
+                    (f"buy_shares_{i+1}", self.buy_shares[:, i]),
+                    (f"sell_price_{i+1}", self.sell_prices[:, i]),
+                    (f"sell_shares_{i+1}", self.sell_shares[:, i]),
+                ]
+            )
+        return columns
+
+    def missing_levels(self, prices: np.ndarray) -> np.ndarray:
+        """
+        Finds the missing levels in recorded prices.
+
+        Parameters:
+        prices (np.ndarray): Recorded prices, e.g. a column of buy_prices.
+
+        Returns:
+        np.ndarray: Boolean mask, True where there was no level.
+        """
+        return prices == 0 if self.integer_prices else np.isnan(prices)
+
+    def _has_price(self, price: float) -> bool:
+        # Missing levels are marked by a price of 0, or NaN (which differs from itself)
+        return price != 0 if self.integer_prices else price == price
+
+    def __iter__(self) -> Iterator[List[Optional[float]]]:
+        """
+        Iterates over the recorded states as rows in the layout of the CSV export, with None
+        for missing levels, e.g. for export_to_csv.
+        """
+        for i in range(self._size):
+            record: List[Optional[float]] = [int(self._timestamps[i])]
+            buy_prices = self._buy_prices[i].tolist()
+            buy_shares = self._buy_shares[i].tolist()
+            sell_prices = self._sell_prices[i].tolist()
+            sell_shares = self._sell_shares[i].tolist()
+            for j in range(self.depth):
+                buy = self._has_price(buy_prices[j])
+                sell = self._has_price(sell_prices[j])
+                record.extend(
+                    [
+                        buy_prices[j] if buy else None,
+                        buy_shares[j] if buy else None,
+                        sell_prices[j] if sell else None,
+                        sell_shares[j] if sell else None,
+                    ]
+                )
+            yield record
+
+    def to_frame(self):
+        """
+        Builds a pandas DataFrame of the history, with the columns of the CSV export.
+
+        Returns:
+        pd.DataFrame: The history.
+        """
+        import pandas as pd
+
+        return pd.DataFrame(dict(self.columns()), copy=False)
+
+
+class TradeHistory:
+    def __init__(
+        self, integer_prices: bool = True, capacity: int = DEFAULT_CAPACITY
+    ) -> None:
+        """
+        Initializes a columnar history of trades, growing like BookHistory (by copying into
+        larger contiguous columns).
+
+        Parameters:
+        integer_prices (bool): If True, prices are uint32 ticks, otherwise float64.
+        capacity (int): Number of trades allocated up front.
+        """
+        self._size = 0
+        self._timestamps = np.zeros(capacity, dtype=np.int64)
+        self._shares = np.zeros(capacity, dtype=np.uint32)
+        self._prices = np.zeros(
+            capacity, dtype=np.uint32 if integer_prices else np.float64
+        )
+
+    def append(self, trade: Tuple[int, int, float]) -> None:
+        """
+        Records a trade.
+
+        Parameters:
+        trade (Tuple[int, int, float]): Trade with form (timestamp, shares, price).
+        """
+        i = self._size
+        if i == len(self._timestamps):
+            capacity = _next_capacity(i)
+            self._timestamps = _grown(self._timestamps, capacity)
+            self._shares = _grown(self._shares, capacity)
+            self._prices = _grown(self._prices, capacity)
+        self._timestamps[i], self._shares[i], self._prices[i] = trade
+        self._size = i + 1
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._timestamps[: self._size]
+
+    @property
+    def shares(self) -> np.ndarray:
+        return self._shares[: self._size]
+
+    @property
+    def prices(self) -> np.ndarray:
+        return self._prices[: self._size]
+
+    def __iter__(self) -> Iterator[Tuple[int, int, float]]:
+        return zip(self.timestamps.tolist(), self.shares.tolist(), self.prices.tolist())
+
+    def to_frame(self):
+        """
+        Builds a pandas DataFrame of the trades, with the columns of the CSV export.
+
+        Returns:
+        pd.DataFrame: The trades.
+        """
+        import pandas as pd
+
+        return pd.DataFrame(
+            {
+                "timestamp": self.timestamps,
+                "shares": self.shares,
+                "prices": self.prices,
+            },
+            copy=False,
+        )
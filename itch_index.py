@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import os
+import struct
+import sys
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+import parse_itch5 as itch
+from itch_reader import map_file
+
+# File layout, all little-endian:
+#   header: magic, size of the indexed file, number of offsets, number of directory entries
+#   locate starts: int64 per stock locate plus one, position of the first offset of each locate
+#   offsets: int64 per order book message, the position of its body, grouped by stock locate
+#       and in file order within each locate
+#   minute offsets: int64 per minute of the day, position of the length prefix of the first
+#       message at or after the start of the minute (the file size if there is none)
+#   directory: stock locate (uint16) and symbol (8 bytes) of each stock directory message
+MAGIC = b"ITCHIDX1"
+_HEADER = struct.Struct("<8sQQQ")
+MINUTES_PER_DAY = 24 * 60
+_MINUTE = 60 * 10**9
+_LOCATES = 1 << 16
+
+# Message types indexed by stock locate, including the stock directory which creates a book
+INDEXED_MESSAGE_TYPES = b"RAFECXDUPQ"
+
+
+def default_index_path(path: str) -> str:
+    return f"{path}.idx"
+
+
+def message_timestamps(buffer, offsets: np.ndarray) -> np.ndarray:
+    """
+    Reads the 48-bit timestamp of messages, which follows the stock locate and tracking number.
+
+    Parameters:
+    buffer (Buffer): Contents of the file, e.g. an mmap.mmap or bytes object.
+    offsets (np.ndarray): Positions of the message bodies.
+
+    Returns:
+    np.ndarray: Nanoseconds since midnight of each message, as int64.
+    """
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    timestamps = np.zeros(len(offsets), dtype=np.int64)
+    for byte in range(4, 10):
+        timestamps <<= 8
+        timestamps |= data[offsets + byte]
+    del data
+    return timestamps
+
+
+def build_index(path: str, index_path: Optional[str] = None) -> str:
+    """
+    Scans an ITCH file once and writes its sidecar index, which lets later reconstructions
+    read only the messages of the selected stocks.
+
+    Parameters:
+    path (str): The path to the binary file.
+    index_path (str, optional): Path of the index, the file's path followed by .idx by default.
+
+    Returns:
+    str: Path of the index.
+    """
+    index_path = index_path or default_index_path(path)
+    with map_file(path) as mapped:
+        index = itch.index_messages(mapped)
+        locates = itch.message_locates(mapped, index.offsets)
+        timestamps = message_timestamps(mapped, index.offsets)
+        directory = []
+        for offset in index.offsets[index.types == ord("R")].tolist():
+            m = itch.parse_stock_directory(mapped, offset)
+            directory.append((m[0], m[3].encode()))
+        file_size = len(mapped)
+
+    is_indexed = np.isin(index.types, np.frombuffer(INDEXED_MESSAGE_TYPES, np.uint8))
+    order = np.flatnonzero(is_indexed)
+    order = order[np.argsort(locates[order], kind="stable")]
+    locate_starts = np.zeros(_LOCATES + 1, dtype="<i8")
+    np.cumsum(np.bincount(locates[order], minlength=_LOCATES), out=locate_starts[1:])
+
+    # Timestamps are increasing in a well-formed file, the running maximum guards the search
+    np.maximum.accumulate(timestamps, out=timestamps)
+    first = np.searchsorted(timestamps, np.arange(MINUTES_PER_DAY) * _MINUTE)
+    prefixes = np.append(index.offsets - 3, file_size)
+    minute_offsets = prefixes[first]
+
+    directory_entries = np.array(directory, dtype=[("locate", "<u2"), ("symbol", "S8")])
+    with open(index_path, "wb") as file:
+        file.write(_HEADER.pack(MAGIC, file_size, len(order), len(directory)))
+        for array in (
+            locate_starts,
+            index.offsets[order].astype("<i8"),
+            minute_offsets.astype("<i8"),
+            directory_entries,
+        ):
+            file.write(array.tobytes())
+    return index_path
+
+
+class ItchIndex:
+    def __init__(self, index_path: str, path: Optional[str] = None) -> None:
+        """
+        Opens the sidecar index of an ITCH file, memory-mapped so that only the offsets of the
+        looked up stocks are loaded.
+
+        Parameters:
+        index_path (str): Path of the index written by build_index.
+        path (str, optional): Path of the indexed file, checked against the index if given.
+
+        Raises:
+        ValueError: If the file is not an index, or does not match the indexed file.
+        """
+        data = np.memmap(index_path, dtype=np.uint8, mode="r")
+        if len(data) < _HEADER.size:
+            raise ValueError(f"{index_path} is not an ITCH index.")
+        magic, self.file_size, n_offsets, n_directory = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError(f"{index_path} is not an ITCH index.")
+        if path is not None and os.path.getsize(path) != self.file_size:
+            raise ValueError(f"{index_path} is not the index of {path}.")
+
+        offset = _HEADER.size
+        sections = []
+        for dtype, count in (
+            ("<i8", _LOCATES + 1),
+            ("<i8", n_offsets),
+            ("<i8", MINUTES_PER_DAY),
+            ([("locate", "<u2"), ("symbol", "S8")], n_directory),
+        ):
+            size = np.dtype(dtype).itemsize * count
+            sections.append(data[offset : offset + size].view(dtype))
+            offset += size
+        self._locate_starts, self._offsets, self.minute_offsets, directory = sections
+        self.symbols: Dict[int, str] = {
+            int(locate): symbol.decode().strip()
+            for locate, symbol in directory.tolist()
+        }
+
+    def locates(self, symbols: Iterable[str]) -> Dict[int, str]:
+        """
+        Looks up the stock locates of symbols in the stock directory.
+
+        Parameters:
+        symbols (Iterable[str]): The symbols.
+
+        Returns:
+        Dict[int, str]: Symbols keyed by stock locate number, for the symbols of the directory.
+        """
+        symbols = set(symbols)
+        return {
+            locate: symbol
+            for locate, symbol in self.symbols.items()
+            if symbol in symbols
+        }
+
+    def message_count(self, locate: int) -> int:
+        return int(self._locate_starts[locate + 1] - self._locate_starts[locate])
+
+    def message_offsets(self, locates: Iterable[int]) -> np.ndarray:
+        """
+        Gathers the positions of the order book messages of stocks, in file order.
+
+        Parameters:
+        locates (Iterable[int]): Stock locate numbers of the stocks.
+
+        Returns:
+        np.ndarray: Positions of the message bodies, as int64.
+        """
+        starts = self._locate_starts
+        offsets = [
+            self._offsets[starts[locate] : starts[locate + 1]] for locate in locates
+        ]
+        if not offsets:
+            return np.zeros(0, dtype=np.int64)
+        return np.sort(np.concatenate(offsets))
+
+    def offset_at(self, timestamp: int) -> int:
+        """
+        Finds a file position to start reading from to see all messages from a time on.
+
+        Parameters:
+        timestamp (int): Nanoseconds since midnight.
+
+        Returns:
+        int: Position of the length prefix of the first message of the minute of timestamp.
+        """
+        minute = min(max(timestamp // _MINUTE, 0), MINUTES_PER_DAY - 1)
+        return int(self.minute_offsets[minute])
+
+
+if __name__ == "__main__":
+    print("Index written to", build_index(sys.argv[1]))
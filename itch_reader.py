@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import mmap
+from contextlib import contextmanager
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional, Tuple, Union
+
+# Objects the messages can be read from in place
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+# Size of the blocks read from the underlying file, in bytes
+DEFAULT_BLOCK_SIZE = 1 << 22
+
+# Single byte message types indexed by their value, so framing never allocates them
+_MESSAGE_TYPES = tuple(bytes((i,)) for i in range(256))
+
+
+def iter_messages(
+    binary: BinaryIO,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    progress: Optional[Callable[[int], object]] = None,
+) -> Iterator[Tuple[bytes, memoryview]]:
+    """
+    Iterates over the messages of a binary ITCH 5.0 file.
+
+    Each message in the file is framed by a 2-byte big-endian length prefix followed by the
+    message type and the message body. The file is read in large blocks, and every message is
+    handed out as a view into its block, so no per-message reads or copies are made.
+
+    Parameters:
+    binary (BinaryIO): File object opened in binary mode.
+    block_size (int): Number of bytes read from the file at a time.
+    progress (Callable[[int], object], optional): Called with the number of bytes consumed after each block.
+
+    Returns:
+    Iterator[Tuple[bytes, memoryview]]: The message type and a view of the message body
+    (the message without its type byte).
+
+    Raises:
+    ValueError: If the file ends in the middle of a message.
+    """
+    message_types = _MESSAGE_TYPES
+    tail = b""
+    while True:
+        block = binary.read(block_size)
+        if not block:
+            break
+        if tail:
+            block = tail + block
+        view = memoryview(block)
+        end = len(block)
+        position = 0
+        while position + 2 < end:
+            stop = position + 2 + ((block[position] << 8) | block[position + 1])
+            if stop > end:
+                break
+            yield message_types[block[position + 2]], view[position + 3 : stop]
+            position = stop
+        tail = block[position:]
+        if progress is not None:
+            progress(position)
+    if tail:
+        raise ValueError("The file ends with a truncated message.")
+
+
+def iter_message_offsets(
+    buffer: Buffer,
+    start: int = 0,
+    progress: Optional[Callable[[int], object]] = None,
+    progress_interval: int = DEFAULT_BLOCK_SIZE,
+) -> Iterator[Tuple[bytes, int]]:
+    """
+    Iterates over the messages of an in-memory or memory-mapped ITCH 5.0 file.
+
+    Unlike iter_messages, no views are created: only the position of each message body is
+    handed out, so messages can be parsed in place with the offset argument of the parse_*
+    functions.
+
+    Parameters:
+    buffer (Buffer): Contents of the file, e.g. an mmap.mmap or bytes object.
+    start (int): Position of the first message's length prefix.
+    progress (Callable[[int], object], optional): Called with the number of bytes consumed, roughly every progress_interval bytes.
+    progress_interval (int): Number of bytes between calls to progress.
+
+    Returns:
+    Iterator[Tuple[bytes, int]]: The message type and the position of the message body
+    (the message without its type byte) within buffer.
+
+    Raises:
+    ValueError: If the buffer ends in the middle of a message.
+    """
+    message_types = _MESSAGE_TYPES
+    end = len(buffer)
+    position = reported = start
+    while position + 2 < end:
+        stop = position + 2 + ((buffer[position] << 8) | buffer[position + 1])
+        if stop > end:
+            break
+        yield message_types[buffer[position + 2]], position + 3
+        position = stop
+        if progress is not None and position - reported >= progress_interval:
+            progress(position - reported)
+            reported = position
+    if progress is not None:
+        progress(position - reported)
+    if position != end:
+        raise ValueError("The file ends with a truncated message.")
+
+
+def iter_selected_messages(
+    buffer: Buffer,
+    offsets: Iterable[int],
+    progress: Optional[Callable[[int], object]] = None,
+    progress_interval: int = DEFAULT_BLOCK_SIZE,
+) -> Iterator[Tuple[bytes, int]]:
+    """
+    Iterates over a subset of the messages of an in-memory or memory-mapped ITCH 5.0 file,
+    e.g. those of a few stocks found by parse_itch5.index_messages.
+
+    Parameters:
+    buffer (Buffer): Contents of the file, e.g. an mmap.mmap or bytes object.
+    offsets (Iterable[int]): Positions of the message bodies, in the order they are handed out.
+    progress (Callable[[int], object], optional): Called with the distance covered in the file, roughly every progress_interval bytes.
+    progress_interval (int): Number of bytes between calls to progress.
+
+    Returns:
+    Iterator[Tuple[bytes, int]]: The message type and the position of the message body.
+    """
+    message_types = _MESSAGE_TYPES
+    reported = 0
+    for offset in offsets:
+        yield message_types[buffer[offset - 1]], offset
+        if progress is not None and offset - reported >= progress_interval:
+            progress(offset - reported)
+            reported = offset
+    if progress is not None:
+        progress(len(buffer) - reported)
+
+
+@contextmanager
+def map_file(path: str) -> Iterator[mmap.mmap]:
+    """
+    Memory-maps a file for reading.
+
+    Parameters:
+    path (str): Path to the file.
+
+    Returns:
+    Iterator[mmap.mmap]: Context manager yielding the read-only mapping of the file.
+    """
+    with open(path, "rb") as binary:
+        with mmap.mmap(binary.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+from array import array
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from orderbook import Order
+
+# Column value of the side of a slot which holds no order
+_EMPTY = 0
+_BUY = ord("B")
+_SELL = ord("S")
+
+
+class ArrayOrderStore:
+    def __init__(self, capacity: int = 1 << 20) -> None:
+        """
+        Initializes a column store of orders, indexed directly by order reference number.
+
+        ITCH order reference numbers are assigned densely and increasingly during the day, so
+        a single store shared by the order books of all symbols holds every live order in a
+        few flat columns, at 19 bytes per reference number instead of several Python objects
+        per order. Columns grow geometrically as larger reference numbers are seen.
+
+        Parameters:
+        capacity (int): Initial number of reference numbers the columns can hold.
+
+        Attributes:
+        sides (array): Buy/sell indicator of each order as a byte ('B' or 'S'), 0 if there is no order.
+        shares (array): Number of shares of each order.
+        prices (array): Price of each order, in integer ticks of 1/10,000 dollar.
+        timestamps (array): Timestamp of each order in nanoseconds since midnight.
+        locates (array): Stock locate of each order.
+        """
+        self.capacity = capacity
+        self.sides = array("B", bytes(capacity))
+        self.shares = array("I", bytes(4 * capacity))
+        self.prices = array("I", bytes(4 * capacity))
+        self.timestamps = array("q", bytes(8 * capacity))
+        self.locates = array("H", bytes(2 * capacity))
+
+    def _columns(self) -> Tuple[array, ...]:
+        return (self.sides, self.shares, self.prices, self.timestamps, self.locates)
+
+    def reserve(self, order_ref_number: int) -> None:
+        """
+        Grows the columns so that they can hold the given order reference number.
+
+        Parameters:
+        order_ref_number (int): Largest reference number to hold.
+        """
+        if order_ref_number < self.capacity:
+            return
+        capacity = max(2 * self.capacity, order_ref_number + 1)
+        extra = capacity - self.capacity
+        for column in self._columns():
+            column.frombytes(bytes(extra * column.itemsize))
+        self.capacity = capacity
+
+    def view(self, stock_locate: int) -> LocateOrders:
+        """
+        Returns the orders of one stock as a mapping, to be used as the orders of its OrderBook.
+
+        Parameters:
+        stock_locate (int): Stock locate number of the stock.
+
+        Returns:
+        LocateOrders: Mapping of the stock's orders, indexed by reference number.
+        """
+        return LocateOrders(self, stock_locate)
+
+    def locate_order_ref_numbers(self) -> Dict[int, np.ndarray]:
+        """
+        Lists the reference numbers of the live orders of every stock, with a single scan of
+        the columns, rather than one scan per stock as with LocateOrders.order_ref_numbers.
+
+        Returns:
+        Dict[int, np.ndarray]: Reference numbers of the live orders of each stock locate with
+        any, in increasing order.
+        """
+        sides = np.frombuffer(self.sides, dtype=np.uint8)
+        locates = np.frombuffer(self.locates, dtype=np.uint16)
+        refs = np.flatnonzero(sides != _EMPTY)
+        ref_locates = locates[refs]
+        # Release the buffers of the columns, which cannot grow while they are exported
+        del sides, locates
+        # A stable sort keeps the reference numbers of each stock in increasing order
+        refs = refs[np.argsort(ref_locates, kind="stable")]
+        ref_locates.sort()
+        stock_locates, starts = np.unique(ref_locates, return_index=True)
+        return dict(zip(stock_locates.tolist(), np.split(refs, starts[1:])))
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns the memory used by the columns, in bytes.
+        """
+        return sum(len(column) * column.itemsize for column in self._columns())
+
+
+class LocateOrders:
+    __slots__ = ("store", "stock_locate", "_count")
+
+    def __init__(self, store: ArrayOrderStore, stock_locate: int) -> None:
+        """
+        Initializes the mapping of the orders of one stock within an ArrayOrderStore.
+
+        The mapping supports the operations OrderBook performs on its orders: membership,
+        lookup, insertion and pop. Lookups return a new Order built from the columns, so
+        changes to the shares of a stored order must be written back with set_shares.
+
+        Parameters:
+        store (ArrayOrderStore): Store holding the columns.
+        stock_locate (int): Stock locate number of the stock.
+        """
+        self.store = store
+        self.stock_locate = stock_locate
+        self._count = 0
+
+    def __contains__(self, order_ref_number: int) -> bool:
+        store = self.store
+        return (
+            order_ref_number < store.capacity
+            and store.sides[order_ref_number] != _EMPTY
+            and store.locates[order_ref_number] == self.stock_locate
+        )
+
+    def __getitem__(self, order_ref_number: int) -> Order:
+        if order_ref_number not in self:
+            raise KeyError(order_ref_number)
+        store = self.store
+        return Order(
+            store.timestamps[order_ref_number],
+            order_ref_number,
+            "B" if store.sides[order_ref_number] == _BUY else "S",
+            store.shares[order_ref_number],
+            store.prices[order_ref_number],
+        )
+
+    def __setitem__(self, order_ref_number: int, order: Order) -> None:
+        store = self.store
+        store.reserve(order_ref_number)
+        if order_ref_number not in self:
+            self._count += 1
+        store.sides[order_ref_number] = (
+            _BUY if order.buy_sell_indicator == "B" else _SELL
+        )
+        store.shares[order_ref_number] = order.shares
+        store.prices[order_ref_number] = order.price
+        store.timestamps[order_ref_number] = order.timestamp
+        store.locates[order_ref_number] = self.stock_locate
+
+    def pop(self, order_ref_number: int, *default: Order) -> Order:
+        if order_ref_number not in self:
+            if default:
+                return default[0]
+            raise KeyError(order_ref_number)
+        order = self[order_ref_number]
+        self.store.sides[order_ref_number] = _EMPTY
+        self._count -= 1
+        return order
+
+    def set_shares(self, order_ref_number: int, shares: int) -> None:
+        """
+        Changes the number of shares of a stored order.
+
+        Parameters:
+        order_ref_number (int): Reference number of the order.
+        shares (int): Updated number of shares.
+        """
+        self.store.shares[order_ref_number] = shares
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.order_ref_numbers())
+
+    def order_ref_numbers(self) -> List[int]:
+        """
+        Lists the reference numbers of the stock's live orders, in increasing order.
+
+        Returns:
+        List[int]: The reference numbers.
+        """
+        store = self.store
+        sides = np.frombuffer(store.sides, dtype=np.uint8)
+        locates = np.frombuffer(store.locates, dtype=np.uint16)
+        refs = np.flatnonzero((sides != _EMPTY) & (locates == self.stock_locate))
+        # Release the buffers of the columns, which cannot grow while they are exported
+        del sides, locates
+        return refs.tolist()
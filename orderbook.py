@@ -2,12 +2,83 @@ from __future__ import annotations
 
 import csv
 import os
-from typing import Dict, List, Optional, Tuple
+from types import ModuleType
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    List,
+    MutableMapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
+import numpy as np
 from sortedcontainers import SortedDict
 
+from bars import BarBuilder
+from delta_history import DEFAULT_KEYFRAME_INTERVAL, write_delta_history
+from features import FeatureEngine
+from history import BookHistory, TradeHistory, history_header
+from parse_itch5 import PRICE_SCALE
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+    from sinks import HistorySink
+
+
+class Ladder(NamedTuple):
+    """
+    Price levels of both sides of an order book, best first.
+
+    Attributes:
+    buy_prices (np.ndarray): Price of each buy level, highest first.
+    buy_shares (np.ndarray): Total shares of each buy level.
+    buy_counts (np.ndarray): Number of orders of each buy level.
+    sell_prices (np.ndarray): Price of each sell level, lowest first.
+    sell_shares (np.ndarray): Total shares of each sell level.
+    sell_counts (np.ndarray): Number of orders of each sell level.
+    """
+
+    buy_prices: np.ndarray
+    buy_shares: np.ndarray
+    buy_counts: np.ndarray
+    sell_prices: np.ndarray
+    sell_shares: np.ndarray
+    sell_counts: np.ndarray
+
+
+# Orders of a price level, as returned by OrderBook.level_orders
+LEVEL_ORDER_DTYPE = np.dtype(
+    [("order_ref_number", np.uint64), ("timestamp", np.int64), ("shares", np.uint32)]
+)
+
+# Events of an order book which callbacks can subscribe to, see OrderBook.subscribe
+EVENTS = (
+    "on_add",
+    "on_execute",
+    "on_cancel",
+    "on_delete",
+    "on_replace",
+    "on_trade",
+    "on_bbo_change",
+)
+
 
 class Order:
+    # Orders are by far the most numerous objects of a reconstruction, slots avoid a
+    # per-instance __dict__
+    __slots__ = (
+        "timestamp",
+        "order_ref_number",
+        "buy_sell_indicator",
+        "shares",
+        "price",
+    )
+
     def __init__(
         self,
         timestamp: int,
@@ -24,7 +95,8 @@ class Order:
         order_ref_number (int): Unique identifier for the order.
         buy_sell_indicator (str): Indicates the type of order: 'B' for buy and 'S' for sell.
         shares (int): The number of shares involved in the order.
-        price (float): The price per share for the order.
+        price (float): The price per share for the order, in integer ticks of 1/10,000 dollar
+            if the order belongs to a book with integer prices.
         """
         self.timestamp = timestamp
         self.order_ref_number = order_ref_number
@@ -55,29 +127,192 @@ class Order:
 
 
 class OrderBook:
-    def __init__(self, stock_symbol: str, depth: int = 3) -> None:
+    def __init__(
+        self,
+        stock_symbol: str,
+        depth: int = 3,
+        integer_prices: bool = False,
+        order_store: Optional[MutableMapping[int, Order]] = None,
+        skip_unchanged: bool = False,
+        columnar: bool = False,
+        sink: Optional[HistorySink] = None,
+        sample_interval: Optional[int] = None,
+        sample_events: Optional[int] = None,
+        bar_sizes: Sequence[int] = (),
+        feature_levels: Optional[int] = None,
+    ) -> None:
         """
         Initializes an OrderBook for a specific stock.
 
         Parameters:
         stock_symbol (str): Symbol of the stock associated with this order book.
         depth (int): Depth of price levels to record.
+        integer_prices (bool): If True, prices are integer ticks of 1/10,000 dollar throughout
+            the book and its histories, and are only converted to decimal on export.
+        order_store (MutableMapping[int, Order], optional): Storage of the orders replacing the default
+            dictionary, e.g. an ArrayOrderStore view from order_store.py, which requires integer prices.
+            Its lookups return copies, so it must provide set_shares to write share changes back. With
+            an order store, the per-order buy_orders and sell_orders are not maintained, and snapshots
+            are built from the price level aggregates only.
+        skip_unchanged (bool): If True, a state is only recorded when its levels, up to the recorded
+            depth, differ from those of the previously recorded state.
+        columnar (bool): If True, the order book and trade histories are kept in preallocated NumPy
+            columns (BookHistory and TradeHistory) instead of lists of Python objects.
+        sink (HistorySink, optional): Sink from sinks.py which the states and trades are streamed to as
+            they are recorded, instead of being kept in memory. The sink must be closed (see close)
+            once the book is done. Cannot be combined with columnar.
+        sample_interval (int, optional): If given, states are recorded on a clock grid instead of after
+            every message: at every multiple of sample_interval nanoseconds, the state after the last
+            message at or before it is recorded, carried forward over grid points without messages.
+            The grid point at or before the last message is recorded by close, which can carry
+            the state forward to a later end time.
+        sample_events (int, optional): If given, a state is only recorded after every sample_events
+            messages. Cannot be combined with sample_interval.
+        bar_sizes (Sequence[int]): Time spans in nanoseconds of OHLCV bars built from the trades as
+            they are recorded, e.g. (60 * 10**9,) for one-minute bars. Finished bars are written to
+            the sink if the book has one.
+        feature_levels (int, optional): If given, top of book features (spread, mid price, microprice,
+            imbalance of this many levels and order flow imbalance) are updated after every message,
+            see FeatureEngine.
 
         Attributes:
-        orders (Dict[int, Order]): Orders indexed by reference number, storing all active orders.
-        buy_orders (SortedDict): Sorted buy orders, with highest bids first.
-        sell_orders (SortedDict): Sorted sell orders, with lowest asks first.
-        trades (List[Tuple[int, int, float]]): Completed trades with form (timestamp, shares, price).
+        orders (MutableMapping[int, Order]): Orders indexed by reference number, storing all active orders.
+        buy_orders (SortedDict): Sorted buy orders, with highest bids first (empty with an order store).
+        sell_orders (SortedDict): Sorted sell orders, with lowest asks first (empty with an order store).
+        buy_levels (SortedDict): Aggregated buy price levels keyed by negated price, with highest bids
+            first, each holding [total shares, order count].
+        sell_levels (SortedDict): Aggregated sell price levels keyed by price, with lowest asks first,
+            each holding [total shares, order count].
+        trades (List[Tuple[int, int, float]]): Completed trades with form (timestamp, shares, price),
+            a TradeHistory if the book is columnar, or the sink's buffer of trades.
         order_book_history (List[List[Optional[float]]]): Historical snapshots of the order book state,
-            each including order levels up to the specified depth.
+            each including order levels up to the specified depth, a BookHistory if the book is columnar,
+            or the sink's buffer of states.
+        bars (Dict[int, BarBuilder]): Bar builders keyed by bar size, holding the finished bars.
+        features (FeatureEngine, optional): Columns of top of book features, if feature_levels is given.
         """
         self.stock_symbol = stock_symbol
         self.depth = depth
-        self.orders: Dict[int, Order] = {}
+        self.integer_prices = integer_prices
+        if order_store is not None and not integer_prices:
+            raise ValueError("An order store requires integer prices.")
+        if sink is not None and columnar:
+            raise ValueError("A sink cannot be combined with columnar histories.")
+        if sample_interval is not None and sample_events is not None:
+            raise ValueError("States are sampled on a clock or by events, not both.")
+        self.orders: MutableMapping[int, Order] = (
+            {} if order_store is None else order_store
+        )
+        # The per-order sorted dictionaries are only kept with the default storage
+        self.track_queues = order_store is None
         self.buy_orders: SortedDict[Tuple[float, int, int], Order] = SortedDict()
         self.sell_orders: SortedDict[Tuple[float, int, int], Order] = SortedDict()
-        self.trades: List[Tuple[int, int, float]] = []
-        self.order_book_history: List[Tuple[Optional[float]]] = []
+        self.buy_levels: SortedDict[float, List[int]] = SortedDict()
+        self.sell_levels: SortedDict[float, List[int]] = SortedDict()
+        self.columnar = columnar
+        self.sink = sink
+        if sink is not None:
+            # Records are appended to the sink's buffers, which write them out in batches
+            self.trades = sink.trades
+            self.order_book_history = sink.states
+        elif columnar:
+            self.trades = TradeHistory(integer_prices)
+            self.order_book_history = BookHistory(depth, integer_prices)
+        else:
+            self.trades: List[Tuple[int, int, float]] = []
+            self.order_book_history: List[Tuple[Optional[float]]] = []
+        self.skip_unchanged = skip_unchanged
+        # Levels of the last recorded state, compared against when skipping unchanged states
+        self._last_levels: Optional[Tuple[list, list]] = None
+        # States and trades are only recorded while True, e.g. not while fast-forwarding
+        # to the start of a time window
+        self.recording = True
+        self.sample_interval = sample_interval
+        self.sample_events = sample_events
+        # Sampling step replacing the recording of every state, if states are sampled
+        self._sample: Optional[Callable[[int], None]] = None
+        if sample_interval is not None:
+            self._sample = self._sample_clock
+        elif sample_events is not None:
+            self._sample = self._sample_event
+        # Levels and time of the last message, and next grid point, when sampling on a clock
+        self._sampled_levels: Optional[Tuple[list, list]] = None
+        self._sampled_time = 0
+        self._next_sample = 0
+        # Messages since the last recorded state, when sampling by events
+        self._events = 0
+        self.bars: Dict[int, BarBuilder] = {
+            bar_size: BarBuilder(
+                bar_size,
+                integer_prices,
+                sink.bars(bar_size).append if sink is not None else None,
+            )
+            for bar_size in bar_sizes
+        }
+        self._bar_builders = list(self.bars.values())
+        self.features: Optional[FeatureEngine] = (
+            FeatureEngine(feature_levels, integer_prices)
+            if feature_levels is not None
+            else None
+        )
+        # Callbacks of each event, see subscribe; the lists are also attributes, so that
+        # events without callbacks are skipped after a single check
+        self._subscribers: Dict[str, List[Callable[..., None]]] = {
+            event: [] for event in EVENTS
+        }
+        self._on_add = self._subscribers["on_add"]
+        self._on_execute = self._subscribers["on_execute"]
+        self._on_cancel = self._subscribers["on_cancel"]
+        self._on_delete = self._subscribers["on_delete"]
+        self._on_replace = self._subscribers["on_replace"]
+        self._on_trade = self._subscribers["on_trade"]
+        self._on_bbo_change = self._subscribers["on_bbo_change"]
+        # Best bid and offer passed to the last on_bbo_change callbacks
+        self._bbo: Tuple[Optional[float], int, Optional[float], int] = (
+            None,
+            0,
+            None,
+            0,
+        )
+
+    def subscribe(self, event: str, callback: Callable[..., None]) -> None:
+        """
+        Registers a callback run on every event of a type, after the book is updated.
+
+        The callbacks of each event are called with:
+        on_add: timestamp, the added order.
+        on_execute: timestamp, the executed order (with its remaining shares), executed shares
+            and execution price.
+        on_cancel: timestamp, the order (with its remaining shares) and cancelled shares.
+        on_delete: timestamp, the deleted order.
+        on_replace: timestamp, the replaced order and the new order.
+        on_trade: timestamp, shares and price of a trade, as recorded in the trade history.
+        on_bbo_change: timestamp, best bid price and shares, and best ask price and shares,
+            after a message which changed them, with None prices for an empty side.
+        The timestamp of cancels and deletes is None when the book's methods are called
+        without one. Events are raised whether the book is recording or not, and events
+        without callbacks cost a single check.
+
+        Parameters:
+        event (str): Type of event, one of EVENTS.
+        callback (Callable[..., None]): Function called with the event.
+
+        Raises:
+        ValueError: If the event is not one of EVENTS.
+        """
+        if event not in EVENTS:
+            raise ValueError(f"Unknown event {event}, expected one of {EVENTS}.")
+        self._subscribers[event].append(callback)
+
+    def unsubscribe(self, event: str, callback: Callable[..., None]) -> None:
+        """
+        Removes a callback registered with subscribe.
+
+        Parameters:
+        event (str): Type of event, one of EVENTS.
+        callback (Callable[..., None]): The registered function.
+        """
+        self._subscribers[event].remove(callback)
 
     def add_order(self, order: Order) -> None:
         """
@@ -86,30 +321,128 @@ class OrderBook:
         Parameters:
         order (Order): The order to be added.
         """
+        self._insert_order(order)
+        if self._on_add:
+            for callback in self._on_add:
+                callback(order.timestamp, order)
+
+    def _insert_order(self, order: Order) -> None:
         self.orders[order.order_ref_number] = order
 
         if order.buy_sell_indicator == "B":
-            order_key = (-order.price, order.timestamp, order.order_ref_number)
-            self.buy_orders[order_key] = order
+            price_key = -order.price
+            orders, levels = self.buy_orders, self.buy_levels
+        else:
+            price_key = order.price
+            orders, levels = self.sell_orders, self.sell_levels
+        if self.track_queues:
+            orders[(price_key, order.timestamp, order.order_ref_number)] = order
+
+        level = levels.get(price_key)
+        if level is None:
+            levels[price_key] = [order.shares, 1]
         else:
-            order_key = (order.price, order.timestamp, order.order_ref_number)
-            self.sell_orders[order_key] = order
+            level[0] += order.shares
+            level[1] += 1
 
-    def remove_order(self, order_ref_number: int) -> None:
+    def remove_order(
+        self, order_ref_number: int, timestamp: Optional[int] = None
+    ) -> None:
         """
         Removes an order from the order book.
 
         Parameters:
         order_ref_number (int): Reference number of the order to remove.
+        timestamp (int, optional): Timestamp of the deletion, passed to the subscribers.
         """
         if order_ref_number in self.orders:
-            order = self.orders.pop(order_ref_number)
-            if order.buy_sell_indicator == "B":
-                order_key = (-order.price, order.timestamp, order_ref_number)
-                self.buy_orders.pop(order_key, None)
-            else:
-                order_key = (order.price, order.timestamp, order_ref_number)
-                self.sell_orders.pop(order_key, None)
+            order = self._pop_order(order_ref_number)
+            if self._on_delete:
+                for callback in self._on_delete:
+                    callback(timestamp, order)
+
+    def _pop_order(self, order_ref_number: int) -> Order:
+        order = self.orders.pop(order_ref_number)
+        if order.buy_sell_indicator == "B":
+            price_key = -order.price
+            orders, levels = self.buy_orders, self.buy_levels
+        else:
+            price_key = order.price
+            orders, levels = self.sell_orders, self.sell_levels
+        if self.track_queues:
+            orders.pop((price_key, order.timestamp, order_ref_number), None)
+
+        level = levels[price_key]
+        if level[1] == 1:
+            del levels[price_key]
+        else:
+            level[0] -= order.shares
+            level[1] -= 1
+        return order
+
+    def replace_order(
+        self,
+        timestamp: int,
+        order_ref_number: int,
+        new_order_ref_number: int,
+        shares: int,
+        price: float,
+    ) -> None:
+        """
+        Replaces an order with a new order on the same side, which loses the time priority of
+        the original order.
+
+        Parameters:
+        timestamp (int): Timestamp of the replacement, the time priority of the new order.
+        order_ref_number (int): Reference number of the order to replace.
+        new_order_ref_number (int): Reference number of the new order.
+        shares (int): Number of shares of the new order.
+        price (float): Price of the new order.
+        """
+        if order_ref_number in self.orders:
+            order = self._pop_order(order_ref_number)
+            new_order = Order(
+                timestamp, new_order_ref_number, order.buy_sell_indicator, shares, price
+            )
+            self._insert_order(new_order)
+            if self._on_replace:
+                for callback in self._on_replace:
+                    callback(timestamp, order, new_order)
+
+    def _update_shares(self, order: Order, new_shares: int) -> None:
+        """
+        Changes the number of shares of a resting order, keeping its price level aggregate in sync.
+
+        Parameters:
+        order (Order): The order to update.
+        new_shares (int): Updated number of shares in the order.
+        """
+        if order.buy_sell_indicator == "B":
+            self.buy_levels[-order.price][0] += new_shares - order.shares
+        else:
+            self.sell_levels[order.price][0] += new_shares - order.shares
+        order.update_order(None, new_shares, None)
+        if not self.track_queues:
+            self.orders.set_shares(order.order_ref_number, new_shares)
+
+    def cancel_order(
+        self, order_ref_number: int, shares: int, timestamp: Optional[int] = None
+    ) -> None:
+        """
+        Cancels part of an order, reducing its shares. Orders of the book must be changed through
+        the book's methods rather than Order.update_order, so that price levels stay in sync.
+
+        Parameters:
+        order_ref_number (int): Reference number of the order to cancel shares of.
+        shares (int): Number of shares cancelled.
+        timestamp (int, optional): Timestamp of the cancellation, passed to the subscribers.
+        """
+        if order_ref_number in self.orders:
+            order = self.orders[order_ref_number]
+            self._update_shares(order, order.shares - shares)
+            if self._on_cancel:
+                for callback in self._on_cancel:
+                    callback(timestamp, order, shares)
 
     def process_trade(
         self,
@@ -133,35 +466,97 @@ class OrderBook:
             order = self.orders[order_ref_number]
             new_shares = order.shares - shares
             if new_shares <= 0:
-                self.remove_order(order_ref_number)
+                # Subscribers see the order as executed, with no shares remaining
+                order = self._pop_order(order_ref_number)
+                order.update_order(None, max(new_shares, 0), None)
             else:
-                order.update_order(None, new_shares, None)
+                self._update_shares(order, new_shares)
+            if self._on_execute:
+                for callback in self._on_execute:
+                    callback(
+                        timestamp,
+                        order,
+                        shares,
+                        price if price is not None else order.price,
+                    )
             if printable:
                 price = price if price is not None else order.price
                 self.record_trade(timestamp, shares, price)
 
-    def _accumulate_order_levels(self, orders: SortedDict) -> List[Tuple[float, int]]:
+    def _accumulate_order_levels(self, levels: SortedDict) -> List[Tuple[float, int]]:
         """
-        Accumulates the top levels of the order book, up to the orderbook's specified depth.
+        Collects the top levels of the order book, up to the orderbook's specified depth.
+
+        The shares are read from the price level aggregates, so the cost does not depend on the
+        number of orders resting at each level.
 
         Parameters:
-        orders (SortedDict): Sorted dictionary of orders.
-        depth (int): Number of levels to accumulate.
+        levels (SortedDict): Sorted dictionary of price level aggregates.
 
         Returns:
         List[Tuple[float, int]]: Price and aggregated shares at each level.
         """
-        levels = []
-        for (price, _, _), order in orders.items():
-            price = abs(price)
-            if len(levels) < self.depth:
-                if len(levels) == 0 or levels[-1][0] != price:
-                    levels.append((price, order.shares))
-                else:
-                    levels[-1] = (levels[-1][0], levels[-1][1] + order.shares)
-            else:
-                break
-        return levels
+        return [
+            (abs(price), levels[price][0]) for price in levels.islice(stop=self.depth)
+        ]
+
+    def _ladder_side(
+        self, levels: SortedDict, depth: Optional[int], sign: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        keys = levels.keys()[:depth]
+        aggregates = np.array(levels.values()[:depth], dtype=np.int64).reshape(-1, 2)
+        prices = np.array(keys, dtype=np.int64 if self.integer_prices else np.float64)
+        return sign * prices, aggregates[:, 0], aggregates[:, 1]
+
+    def ladder(self, depth: Optional[int] = None) -> Ladder:
+        """
+        Builds the L2 ladder of the book: every price level with its total shares and order
+        count, read from the price level aggregates on demand, independently of the recorded
+        history and its depth.
+
+        Parameters:
+        depth (int, optional): Largest number of levels on each side, all levels by default.
+
+        Returns:
+        Ladder: The levels of both sides, best first, with prices in ticks if the book uses
+        integer prices.
+        """
+        return Ladder(
+            *self._ladder_side(self.buy_levels, depth, -1),
+            *self._ladder_side(self.sell_levels, depth, 1),
+        )
+
+    def level_orders(self, buy_sell_indicator: str, price: float) -> np.ndarray:
+        """
+        Builds the L3 view of a price level: its resting orders in time priority.
+
+        L3 views are read from the per-order queues, so they are not available with an order
+        store, which does not keep them: finding the orders of a level would scan the store's
+        columns over every reference number of the day.
+
+        Parameters:
+        buy_sell_indicator (str): Side of the level, 'B' for buy and 'S' for sell.
+        price (float): Price of the level, in ticks if the book uses integer prices.
+
+        Returns:
+        np.ndarray: The orders, of LEVEL_ORDER_DTYPE, first in priority first.
+
+        Raises:
+        ValueError: If the book uses an order store.
+        """
+        if not self.track_queues:
+            raise ValueError("L3 views are not available with an order store.")
+        if buy_sell_indicator == "B":
+            price_key, orders = -price, self.buy_orders
+        else:
+            price_key, orders = price, self.sell_orders
+        # Queue keys are (price key, timestamp, reference number), a level is a key range
+        keys = list(orders.irange((price_key,), (price_key, float("inf"))))
+        level = np.empty(len(keys), dtype=LEVEL_ORDER_DTYPE)
+        level["order_ref_number"] = [key[2] for key in keys]
+        level["timestamp"] = [key[1] for key in keys]
+        level["shares"] = [orders[key].shares for key in keys]
+        return level
 
     def record_trade(
         self,
@@ -170,45 +565,191 @@ class OrderBook:
         price: float,
     ) -> None:
         """
-        Records a completed trade in the order book's trade history.
+        Records a completed trade in the order book's trade history, unless the book's recording
+        attribute is False. The trade is passed to the subscribers in either case.
 
         Parameters:
         timestamp (int): Trade timestamp.
         shares (int): Number of shares traded.
         price (float): Trade price.
         """
+        if self._on_trade:
+            for callback in self._on_trade:
+                callback(timestamp, shares, price)
+        if not self.recording:
+            return
         trade = (timestamp, shares, price)
         self.trades.append(trade)
+        for builder in self._bar_builders:
+            builder.add(timestamp, shares, price)
 
     def record_state(self, timestamp: int) -> None:
         """
         Records the current state of the order book at a specified timestamp up to the orderbook's specified depth.
+        Nothing is recorded while the book's recording attribute is False. If the book skips unchanged states,
+        nothing is recorded when the levels are identical to the last recorded ones, e.g. after a message
+        affecting a price beyond the recorded depth. If the book samples its states, the state is only
+        recorded according to the sampling. The book's features are updated after every message,
+        and changes of the best bid and offer are passed to the subscribers.
 
         Parameters:
         timestamp (int): Timestamp of the trade.
         """
-        buy_levels = self._accumulate_order_levels(self.buy_orders)
-        sell_levels = self._accumulate_order_levels(self.sell_orders)
+        if self._on_bbo_change:
+            self._check_bbo(timestamp)
+        if self.features is not None:
+            self.features.update(
+                timestamp, self.buy_levels, self.sell_levels, self.recording
+            )
+        if not self.recording:
+            return
+        if self._sample is not None:
+            self._sample(timestamp)
+            return
+        buy_levels = self._accumulate_order_levels(self.buy_levels)
+        sell_levels = self._accumulate_order_levels(self.sell_levels)
+        if self.skip_unchanged:
+            levels = (buy_levels, sell_levels)
+            if levels == self._last_levels:
+                return
+            self._last_levels = levels
+        self._append_state(timestamp, buy_levels, sell_levels)
 
-        state_record = [timestamp]
-        for i in range(self.depth):
-            state_record.extend(
-                [
-                    buy_levels[i][0] if i < len(buy_levels) else None,
-                    buy_levels[i][1] if i < len(buy_levels) else None,
-                    sell_levels[i][0] if i < len(sell_levels) else None,
-                    sell_levels[i][1] if i < len(sell_levels) else None,
-                ]
+    def _check_bbo(self, timestamp: int) -> None:
+        bid, bid_shares, ask, ask_shares = None, 0, None, 0
+        if self.buy_levels:
+            key, (bid_shares, _) = self.buy_levels.peekitem(0)
+            bid = -key
+        if self.sell_levels:
+            ask, (ask_shares, _) = self.sell_levels.peekitem(0)
+        bbo = (bid, bid_shares, ask, ask_shares)
+        if bbo != self._bbo:
+            self._bbo = bbo
+            for callback in self._on_bbo_change:
+                callback(timestamp, *bbo)
+
+    def _sample_event(self, timestamp: int) -> None:
+        self._events += 1
+        if self._events == self.sample_events:
+            self._events = 0
+            self._append_state(
+                timestamp,
+                self._accumulate_order_levels(self.buy_levels),
+                self._accumulate_order_levels(self.sell_levels),
             )
+
+    def _sample_clock(self, timestamp: int) -> None:
+        interval = self.sample_interval
+        if self._sampled_levels is None:
+            # First grid point at or after the first message
+            self._next_sample = -(-timestamp // interval) * interval
+        else:
+            # The grid points before this message get the state of the previous one
+            while self._next_sample < timestamp:
+                self._append_state(self._next_sample, *self._sampled_levels)
+                self._next_sample += interval
+        self._sampled_levels = (
+            self._accumulate_order_levels(self.buy_levels),
+            self._accumulate_order_levels(self.sell_levels),
+        )
+        self._sampled_time = timestamp
+
+    def _append_state(
+        self,
+        timestamp: int,
+        buy_levels: List[Tuple[float, int]],
+        sell_levels: List[Tuple[float, int]],
+    ) -> None:
+        """
+        Appends a state to the order book history.
+
+        Parameters:
+        timestamp (int): Timestamp of the state.
+        buy_levels (List[Tuple[float, int]]): Price and shares of the best buy levels, at most depth.
+        sell_levels (List[Tuple[float, int]]): Price and shares of the best sell levels, at most depth.
+        """
+        if self.columnar:
+            self.order_book_history.append_levels(timestamp, buy_levels, sell_levels)
+            return
+
+        # Missing levels are padded with None
+        padding = [(None, None)] * self.depth
+        state_record = [timestamp]
+        for buy_level, sell_level in zip(
+            buy_levels + padding[len(buy_levels) :],
+            sell_levels + padding[len(sell_levels) :],
+        ):
+            state_record += buy_level
+            state_record += sell_level
         self.order_book_history.append(state_record)
 
+    def close(self, end_time: Optional[int] = None) -> None:
+        """
+        Completes the history once no more messages will be processed: records the remaining
+        grid points if the book samples on a clock, emits the open bars, then writes out the
+        records buffered by the book's sink and closes its files.
+
+        Parameters:
+        end_time (int, optional): End of the sampled history, the state after the last message
+            being recorded at every grid point up to it. Defaults to the time of the last message.
+        """
+        if self._sampled_levels is not None:
+            end_time = max(end_time or 0, self._sampled_time)
+            while self._next_sample <= end_time:
+                self._append_state(self._next_sample, *self._sampled_levels)
+                self._next_sample += self.sample_interval
+        for builder in self._bar_builders:
+            builder.close()
+        if self.sink is not None:
+            self.sink.close()
+
+    def _export_price(self, price: Optional[float]) -> Optional[float]:
+        """
+        Converts a recorded price to a decimal price for export.
+
+        Parameters:
+        price (float, optional): Recorded price, in ticks if the book uses integer prices.
+
+        Returns:
+        Optional[float]: Price in dollars, or None if there is no price.
+        """
+        if price is None or not self.integer_prices:
+            return price
+        return price / PRICE_SCALE
+
+    def _history_header(self) -> List[str]:
+        """
+        Builds the column names of the order book history.
+
+        Returns:
+        List[str]: The timestamp followed by the price and shares of each level, buy side first.
+        """
+        return history_header(self.depth)
+
+    def _check_exportable(self) -> None:
+        """
+        Checks that the histories are held by the book, before any export file is opened.
+
+        Raises:
+        ValueError: If the book streams its histories to a sink, whose files an export to the
+            same directory would overwrite.
+        """
+        if self.sink is not None:
+            raise ValueError(
+                "The histories of a book with a sink are streamed to its files, not exported."
+            )
+
     def export_to_csv(self, base_directory: Optional[str] = "output") -> None:
         """
         Exports the order book and trade history to seperate CSV files.
 
         Parameters:
         base_directory (str): Base directory path to create the stock symbol folder and save the CSV files.
+
+        Raises:
+        ValueError: If the book streams its histories to a sink.
         """
+        self._check_exportable()
         directory = os.path.join(base_directory, self.stock_symbol)
         os.makedirs(directory, exist_ok=True)
 
@@ -216,24 +757,282 @@ class OrderBook:
             f"{directory}/{self.stock_symbol}_order_book_history.csv", "w", newline=""
         ) as file:
             writer = csv.writer(file)
-            header = ["timestamp"]
-            for i in range(self.depth):
-                header.extend(
-                    [
-                        f"buy_price_{i+1}",
-                        f"buy_shares_{i+1}",
-                        f"sell_price_{i+1}",
-                        f"sell_shares_{i+1}",
-                    ]
-                )
-            writer.writerow(header)
-            for record in self.order_book_history:
-                writer.writerow(record)
+            writer.writerow(self._history_header())
+            if self.integer_prices:
+                # Prices are at every odd position of the records: timestamp, price, shares, ...
+                for record in self.order_book_history:
+                    record = list(record)
+                    record[1::2] = map(self._export_price, record[1::2])
+                    writer.writerow(record)
+            else:
+                for record in self.order_book_history:
+                    writer.writerow(record)
 
         with open(
             f"{directory}/{self.stock_symbol}_trades.csv", "w", newline=""
         ) as file:
             writer = csv.writer(file)
             writer.writerow(["timestamp", "shares", "prices"])
-            for trade in self.trades:
-                writer.writerow(trade)
+            for timestamp, shares, price in self.trades:
+                writer.writerow((timestamp, shares, self._export_price(price)))
+
+    def _history_table(self) -> pa.Table:
+        """
+        Builds an Arrow table of the order book history, with the columns of the CSV export.
+        Prices are converted to decimal, and missing levels are null.
+
+        Returns:
+        pa.Table: The order book history.
+        """
+        header = self._history_header()
+        if not self.columnar:
+            return _history_rows_table(
+                self.order_book_history, header, self.integer_prices
+            )
+
+        pa, _ = _import_pyarrow()
+
+        history = self.order_book_history
+        arrays = [pa.array(history.timestamps)]
+        for i in range(self.depth):
+            for prices, shares in (
+                (history.buy_prices[:, i], history.buy_shares[:, i]),
+                (history.sell_prices[:, i], history.sell_shares[:, i]),
+            ):
+                missing = history.missing_levels(prices)
+                if self.integer_prices:
+                    prices = prices / PRICE_SCALE
+                arrays.append(pa.array(prices, mask=missing))
+                arrays.append(pa.array(shares, mask=missing))
+        return pa.table(arrays, names=header)
+
+    def _trades_table(self) -> pa.Table:
+        """
+        Builds an Arrow table of the trade history, with the columns of the CSV export.
+
+        Returns:
+        pa.Table: The trade history.
+        """
+        if not self.columnar:
+            return _trade_rows_table(self.trades, self.integer_prices)
+
+        pa, _ = _import_pyarrow()
+        timestamps, shares, prices = (
+            self.trades.timestamps,
+            self.trades.shares,
+            self.trades.prices,
+        )
+        if self.integer_prices:
+            prices = prices / PRICE_SCALE
+        return pa.table(
+            [
+                pa.array(timestamps, type=pa.int64()),
+                pa.array(shares, type=pa.uint32()),
+                pa.array(prices, type=pa.float64()),
+            ],
+            names=["timestamp", "shares", "prices"],
+        )
+
+    def export_to_parquet(
+        self,
+        base_directory: Optional[str] = "output",
+        compression: str = "zstd",
+        row_group_duration: int = 15 * 60 * 10**9,
+    ) -> None:
+        """
+        Exports the order book and trade history to seperate Parquet files, with typed columns.
+
+        Each row group covers a fixed span of time, so that readers filtering on the timestamp
+        can skip the others.
+
+        Parameters:
+        base_directory (str): Base directory path to create the stock symbol folder and save the Parquet files.
+        compression (str): Compression codec of the columns.
+        row_group_duration (int): Time span of each row group in nanoseconds, 15 minutes by default.
+
+        Raises:
+        ValueError: If the book streams its histories to a sink.
+        """
+        self._check_exportable()
+        _, pq = _import_pyarrow()
+        directory = os.path.join(base_directory, self.stock_symbol)
+        os.makedirs(directory, exist_ok=True)
+
+        for table, name in (
+            (self._history_table(), "order_book_history"),
+            (self._trades_table(), "trades"),
+        ):
+            path = f"{directory}/{self.stock_symbol}_{name}.parquet"
+            with pq.ParquetWriter(
+                path, table.schema, compression=compression
+            ) as writer:
+                timestamps = table.column("timestamp").to_numpy()
+                # Rows are in time order, row groups start where the time bucket changes
+                buckets = timestamps // row_group_duration
+                starts = [0, *(np.flatnonzero(np.diff(buckets)) + 1), len(table)]
+                for start, stop in zip(starts[:-1], starts[1:]):
+                    writer.write_table(table.slice(start, stop - start))
+
+    def export_to_feather(
+        self, base_directory: Optional[str] = "output", compression: str = "zstd"
+    ) -> None:
+        """
+        Exports the order book and trade history to seperate Feather (Arrow IPC) files, with typed columns.
+
+        Parameters:
+        base_directory (str): Base directory path to create the stock symbol folder and save the Feather files.
+        compression (str): Compression codec of the columns, "zstd", "lz4" or "uncompressed".
+
+        Raises:
+        ValueError: If the book streams its histories to a sink.
+        """
+        self._check_exportable()
+        _import_pyarrow()
+        from pyarrow import feather
+
+        directory = os.path.join(base_directory, self.stock_symbol)
+        os.makedirs(directory, exist_ok=True)
+
+        feather.write_feather(
+            self._history_table(),
+            f"{directory}/{self.stock_symbol}_order_book_history.feather",
+            compression=compression,
+        )
+        feather.write_feather(
+            self._trades_table(),
+            f"{directory}/{self.stock_symbol}_trades.feather",
+            compression=compression,
+        )
+
+    def _history_levels(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Gathers the order book history into dense arrays, with prices in integer ticks.
+
+        Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: Timestamps, then prices and shares with shape
+        (states, 2 * depth): the buy levels followed by the sell levels, 0 for missing levels.
+        """
+        if self.columnar:
+            history = self.order_book_history
+            timestamps = history.timestamps
+            prices = np.hstack([history.buy_prices, history.sell_prices])
+            shares = np.hstack([history.buy_shares, history.sell_shares])
+        else:
+            timestamps = np.array(
+                [record[0] for record in self.order_book_history], dtype=np.int64
+            )
+            # Missing levels (None) become NaN, records are laid out as
+            # timestamp, then price and shares of each buy then sell level
+            values = np.array(
+                [record[1:] for record in self.order_book_history], dtype=np.float64
+            ).reshape(-1, self.depth, 2, 2)
+            prices = values[..., 0].transpose(0, 2, 1).reshape(-1, 2 * self.depth)
+            shares = values[..., 1].transpose(0, 2, 1).reshape(-1, 2 * self.depth)
+            shares = np.nan_to_num(shares).astype(np.uint32)
+        if not self.integer_prices:
+            prices = np.rint(np.nan_to_num(prices) * PRICE_SCALE)
+        return timestamps, np.nan_to_num(prices).astype(np.uint32), shares
+
+    def export_to_delta(
+        self,
+        base_directory: Optional[str] = "output",
+        keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL,
+    ) -> None:
+        """
+        Exports the order book history to a compact binary file of level changes, read back
+        with delta_history.DeltaHistory.
+
+        Parameters:
+        base_directory (str): Base directory path to create the stock symbol folder and save the file.
+        keyframe_interval (int): Number of states between full keyframes; the states up to a
+            keyframe are decoded to read any state.
+
+        Raises:
+        ValueError: If the book streams its histories to a sink.
+        """
+        self._check_exportable()
+        directory = os.path.join(base_directory, self.stock_symbol)
+        os.makedirs(directory, exist_ok=True)
+        write_delta_history(
+            f"{directory}/{self.stock_symbol}_order_book_history.delta",
+            *self._history_levels(),
+            keyframe_interval,
+        )
+
+
+def _import_pyarrow() -> Tuple[ModuleType, ModuleType]:
+    """
+    Imports pyarrow, which is only required to export to Parquet or Feather.
+
+    Returns:
+    Tuple[ModuleType, ModuleType]: The pyarrow and pyarrow.parquet modules.
+
+    Raises:
+    ImportError: If pyarrow is not installed.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as error:
+        raise ImportError(
+            "pyarrow is required to export to Parquet or Feather: pip install pyarrow"
+        ) from error
+    return pa, pq
+
+
+def _export_prices(prices: Sequence[Optional[float]], integer_prices: bool) -> list:
+    if not integer_prices:
+        return list(prices)
+    return [None if price is None else price / PRICE_SCALE for price in prices]
+
+
+def _history_rows_table(
+    rows: Sequence[Sequence[Optional[float]]], header: List[str], integer_prices: bool
+) -> pa.Table:
+    """
+    Builds an Arrow table from order book states recorded as rows, with decimal prices and
+    missing levels as nulls.
+
+    Parameters:
+    rows (Sequence[Sequence[Optional[float]]]): States in the layout of the CSV export.
+    header (List[str]): Column names.
+    integer_prices (bool): If True, the recorded prices are integer ticks.
+
+    Returns:
+    pa.Table: The states.
+    """
+    pa, _ = _import_pyarrow()
+    columns = list(zip(*rows)) or [()] * len(header)
+    arrays = [pa.array(columns[0], type=pa.int64())]
+    for i, column in enumerate(columns[1:]):
+        if i % 2 == 0:
+            prices = _export_prices(column, integer_prices)
+            arrays.append(pa.array(prices, type=pa.float64()))
+        else:
+            arrays.append(pa.array(column, type=pa.uint32()))
+    return pa.table(arrays, names=header)
+
+
+def _trade_rows_table(
+    trades: Sequence[Tuple[int, int, float]], integer_prices: bool
+) -> pa.Table:
+    """
+    Builds an Arrow table from trades recorded as (timestamp, shares, price) tuples.
+
+    Parameters:
+    trades (Sequence[Tuple[int, int, float]]): The trades.
+    integer_prices (bool): If True, the recorded prices are integer ticks.
+
+    Returns:
+    pa.Table: The trades, with decimal prices.
+    """
+    pa, _ = _import_pyarrow()
+    timestamps, shares, prices = list(zip(*trades)) or [(), (), ()]
+    return pa.table(
+        [
+            pa.array(timestamps, type=pa.int64()),
+            pa.array(shares, type=pa.uint32()),
+            pa.array(_export_prices(prices, integer_prices), type=pa.float64()),
+        ],
+        names=["timestamp", "shares", "prices"],
+    )
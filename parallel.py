@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from tqdm import tqdm
+
+import parse_itch5 as itch
+from itch_index import INDEXED_MESSAGE_TYPES, ItchIndex
+from itch_reader import map_file
+from orderbook import OrderBook
+from reconstruct import reconstruct_orderbook
+
+
+def _stock_directory(buffer, index: itch.MessageIndex) -> Dict[int, str]:
+    """
+    Reads the symbol of every stock locate from the stock directory messages.
+
+    Returns:
+    Dict[int, str]: Symbols keyed by stock locate number.
+    """
+    symbols = {}
+    for offset in index.offsets[index.types == ord("R")].tolist():
+        m = itch.parse_stock_directory(buffer, offset)
+        symbols[m[0]] = m[3]
+    return symbols
+
+
+def _selected(
+    symbols: Dict[int, str], selected_symbols: Optional[set]
+) -> Dict[int, str]:
+    if selected_symbols is None:
+        return symbols
+    return {
+        locate: symbol
+        for locate, symbol in symbols.items()
+        if symbol in selected_symbols
+    }
+
+
+def _balanced_shards(counts: Dict[int, int], n_shards: int) -> List[List[int]]:
+    """
+    Splits stock locates into shards with similar numbers of messages, assigning the busiest
+    locates first, each to the least loaded shard.
+
+    Parameters:
+    counts (Dict[int, int]): Number of messages of each stock locate.
+    n_shards (int): Number of shards.
+
+    Returns:
+    List[List[int]]: The stock locates of each non-empty shard.
+    """
+    shards: List[List[int]] = [[] for _ in range(n_shards)]
+    loads: List[Tuple[int, int]] = [(0, shard) for shard in range(n_shards)]
+    for locate in sorted(counts, key=counts.get, reverse=True):
+        load, shard = heapq.heappop(loads)
+        shards[shard].append(locate)
+        heapq.heappush(loads, (load + counts[locate], shard))
+    return [shard for shard in shards if shard]
+
+
+def _shard_messages(
+    index: itch.MessageIndex,
+    locates: np.ndarray,
+    symbols: Dict[int, str],
+    n_shards: int,
+) -> Tuple[List[List[int]], List[np.ndarray]]:
+    """
+    Splits the order book messages of stocks into shards of similar sizes.
+
+    Parameters:
+    index (itch.MessageIndex): Offsets and types of all messages of the file.
+    locates (np.ndarray): Stock locate of each message.
+    symbols (Dict[int, str]): Symbols of the stocks to split, keyed by stock locate.
+    n_shards (int): Number of shards.
+
+    Returns:
+    Tuple[List[List[int]], List[np.ndarray]]: The stock locates of each shard, and the
+    positions of the message bodies of each shard, in file order.
+    """
+    is_book_message = np.isin(
+        index.types, np.frombuffer(INDEXED_MESSAGE_TYPES, np.uint8)
+    )
+    counts = np.bincount(locates[is_book_message], minlength=1 << 16)
+    shards = _balanced_shards(
+        {locate: int(counts[locate]) for locate in symbols}, n_shards
+    )
+    # Shard of each stock locate, -1 for stocks which are not reconstructed
+    shard_of_locate = np.full(1 << 16, -1, dtype=np.int64)
+    for shard, shard_locates in enumerate(shards):
+        shard_of_locate[shard_locates] = shard
+
+    message_shards = np.where(is_book_message, shard_of_locate[locates], -1)
+    selected = np.flatnonzero(message_shards >= 0)
+    selected = selected[np.argsort(message_shards[selected], kind="stable")]
+    shard_sizes = np.bincount(message_shards[selected], minlength=len(shards))
+    return shards, np.split(index.offsets[selected], np.cumsum(shard_sizes)[:-1])
+
+
+def reconstruct_orderbook_parallel(
+    path: str,
+    selected_symbols: Optional[set] = None,
+    depth: int = 3,
+    workers: Optional[int] = None,
+    index_path: Optional[str] = None,
+    **options,
+) -> Dict[int, OrderBook]:
+    """
+    Reconstructs the order books of many stocks on several cores.
+
+    The file is indexed once (or its sidecar index is read), and the order book messages of the selected stocks are split
+    by stock locate into shards with similar numbers of messages. Each shard is replayed
+    by reconstruct_orderbook in a worker process, reading only the messages of its stocks
+    from the memory-mapped file, and the order books of all shards are merged.
+
+    Args:
+        path (str): The path to the binary file.
+        selected_symbols (set, optional): Symbols to reconstruct the order book for, every
+            symbol of the stock directory if None. Defaults to None.
+        depth (int, optional): The depth of the order book. Defaults to 3.
+        workers (int, optional): Number of worker processes, the number of CPUs by default.
+        index_path (str, optional): Path of the file's sidecar index, built by
+            itch_index.build_index. If given, the shards are read from the index instead of
+            scanning the file. Defaults to None.
+        **options: Other options of reconstruct_orderbook, e.g. integer_prices or
+            sink_directory, which is recommended when reconstructing many stocks so that their
+            histories are not sent back from the workers.
+
+    Returns:
+        dict: A dictionary of order books, keyed by stock locate number.
+
+    Raises:
+        FileNotFoundError: If the specified file path does not exist.
+        ValueError: If the index does not match the file.
+
+    Example:
+        >>> path = "/path/to/data/01302019.NASDAQ_ITCH50"
+        >>> order_books = reconstruct_orderbook_parallel(path, workers=64, sink_directory="output")
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError("The specified file path does not exist.")
+    workers = workers or os.cpu_count() or 1
+
+    if index_path is not None:
+        index = ItchIndex(index_path, path)
+        symbols = _selected(index.symbols, selected_symbols)
+        shards = _balanced_shards(
+            {locate: index.message_count(locate) for locate in symbols}, workers
+        )
+        shard_offsets = [index.message_offsets(shard) for shard in shards]
+    else:
+        with map_file(path) as mapped:
+            message_index = itch.index_messages(mapped)
+            locates = itch.message_locates(mapped, message_index.offsets)
+            symbols = _selected(
+                _stock_directory(mapped, message_index), selected_symbols
+            )
+        shards, shard_offsets = _shard_messages(
+            message_index, locates, symbols, workers
+        )
+        del message_index, locates
+
+    order_book: Dict[int, OrderBook] = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                reconstruct_orderbook,
+                path,
+                {symbols[locate] for locate in shard_locates},
+                depth,
+                message_offsets=offsets,
+                show_progress=False,
+                **options,
+            )
+            for shard_locates, offsets in zip(shards, shard_offsets)
+        ]
+        for future in tqdm(
+            as_completed(futures), total=len(futures), desc="Reconstructing Shards"
+        ):
+            order_book.update(future.result())
+    return order_book
@@ -1,11 +1,50 @@
 from __future__ import annotations
 
 import struct
-from typing import Tuple
+from array import array
+from typing import Callable, Dict, Iterable, NamedTuple, Tuple
+
+import numpy as np
+
+from itch_reader import Buffer, map_file
+
+# Prices are transmitted as integers in ticks of 1/10,000 dollar
+PRICE_SCALE = 10000
+
+# Precompiled message layouts (without the message type byte). The 48-bit timestamps are
+# unpacked as a 16-bit high part and a 32-bit low part, which is cheaper than int.from_bytes.
+_STOCK_DIRECTORY = struct.Struct("!HH6s8sccIcc2scccccIc")
+_ADD_ORDER = struct.Struct("!HHHIQcI8sL")
+_ADD_ORDER_WITH_MPID = struct.Struct("!HHHIQcI8sL4s")
+_ORDER_EXECUTED = struct.Struct("!HHHIQIQ")
+_ORDER_EXECUTED_PRICE = struct.Struct("!HHHIQIQcL")
+_ORDER_CANCEL = struct.Struct("!HHHIQI")
+_ORDER_DELETE = struct.Struct("!HHHIQ")
+_ORDER_REPLACE = struct.Struct("!HHHIQQIL")
+_TRADE = struct.Struct("!HHHIQcI8sLQ")
+_CROSS_TRADE = struct.Struct("!HHHIQ8sLQc")
+# 48-bit timestamp shared by all messages, after the stock locate and tracking number
+_TIMESTAMP = struct.Struct("!HI")
+
+
+def peek_timestamp(a: bytes, offset: int = 0) -> int:
+    """
+    Reads the timestamp of any message without parsing the rest of it.
+
+    Parameters:
+    a (bytes): The message body in bytes.
+    offset (int): Position of the message body within a, defaults to 0.
+
+    Returns:
+    int: Nanoseconds since midnight.
+    """
+    ts_high, ts_low = _TIMESTAMP.unpack_from(a, offset + 4)
+    return ts_high << 32 | ts_low
 
 
 def parse_stock_directory(
     a: bytes,
+    offset: int = 0,
 ) -> Tuple[
     int,
     int,
@@ -50,19 +89,22 @@ def parse_stock_directory(
 
     Parameters:
     a (bytes): The stock directory message in bytes to be parsed.
+    offset (int): Position of the message body within a, defaults to 0.
 
     Returns:
     Tuple[int, int, bytes, bytes, str, str, int, str, str, str, str, str, str, str, str, int, str]:
     A tuple containing the parsed values.
     """
-    m = struct.unpack("!HH6s8sccIcc2scccccIc", a)
-    m = list(m)
+    # With 17 fields, a list round trip is cheaper than rebuilding the tuple
+    m = list(_STOCK_DIRECTORY.unpack_from(a, offset))
     m[3] = m[3].decode().strip()
     return tuple(m)
 
 
 # Message Type A
-def parse_add_order(a: bytes) -> Tuple[int, int, int, int, str, int, str, float]:
+def parse_add_order(
+    a: bytes, offset: int = 0, integer_prices: bool = False
+) -> Tuple[int, int, int, int, str, int, str, float]:
     """
     Parse an add order message.
 
@@ -77,26 +119,37 @@ def parse_add_order(a: bytes) -> Tuple[int, int, int, int, str, int, str, float]
     7. Stock
     8. Price
 
-    The price is converted from integer to floating-point by dividing by 10,000.
+    The price is converted from integer to floating-point by dividing by 10,000,
+    unless integer_prices is True, in which case it is kept in ticks of 1/10,000 dollar.
 
     Parameters:
     a (bytes): The add order message in bytes to be parsed.
+    offset (int): Position of the message body within a, defaults to 0.
+    integer_prices (bool): If True, the price is returned as an integer number of ticks.
 
     Returns:
     Tuple[int, int, int, int, str, int, str, float]: A tuple containing the parsed values.
     """
-    m = struct.unpack("!HH6sQcI8sL", a)
-    m = list(m)
-    m[4] = m[4].decode()
-    m[6] = m[6].decode().strip()
-    m[2] = int.from_bytes(m[2], byteorder="big")
-    m[7] = float(m[7]) / 10000
-    return tuple(m)
+    locate, tracking, ts_high, ts_low, ref, side, shares, stock, price = (
+        _ADD_ORDER.unpack_from(a, offset)
+    )
+    return (
+        locate,
+        tracking,
+        ts_high << 32 | ts_low,
+        ref,
+        side.decode(),
+        shares,
+        stock.decode().strip(),
+        price if integer_prices else price / PRICE_SCALE,
+    )
 
 
 # Message Type F
 def parse_add_order_with_mpid(
     a: bytes,
+    offset: int = 0,
+    integer_prices: bool = False,
 ) -> Tuple[int, int, int, int, str, int, str, float, bytes]:
     """
     Parse an add order with MPID message.
@@ -113,26 +166,37 @@ def parse_add_order_with_mpid(
     8. Price
     9. Attribution
 
-    The price is converted from integer to floating-point by dividing by 10,000.
+    The price is converted from integer to floating-point by dividing by 10,000,
+    unless integer_prices is True, in which case it is kept in ticks of 1/10,000 dollar.
 
     Parameters:
     a (bytes): The add order with MPID message in bytes to be parsed.
+    offset (int): Position of the message body within a, defaults to 0.
+    integer_prices (bool): If True, the price is returned as an integer number of ticks.
 
     Returns:
     Tuple[int, int, int, int, str, int, str, float]: A tuple containing the parsed values.
     """
-    m = struct.unpack("!HH6sQcI8sL4s", a)
-    m = list(m)
-    m[4] = m[4].decode()
-    m[6] = m[6].decode().strip()
-    m[2] = int.from_bytes(m[2], byteorder="big")
-    m[7] = float(m[7]) / 10000
-    m.pop()  # Remove the attribution as it is not used
-    return tuple(m)
+    # The attribution is not used, so it is not returned
+    locate, tracking, ts_high, ts_low, ref, side, shares, stock, price, _ = (
+        _ADD_ORDER_WITH_MPID.unpack_from(a, offset)
+    )
+    return (
+        locate,
+        tracking,
+        ts_high << 32 | ts_low,
+        ref,
+        side.decode(),
+        shares,
+        stock.decode().strip(),
+        price if integer_prices else price / PRICE_SCALE,
+    )
 
 
 # Message Type E
-def parse_order_executed(a: bytes) -> Tuple[int, int, int, int, int, int]:
+def parse_order_executed(
+    a: bytes, offset: int = 0
+) -> Tuple[int, int, int, int, int, int]:
     """
     Parse an order executed message.
 
@@ -147,19 +211,22 @@ def parse_order_executed(a: bytes) -> Tuple[int, int, int, int, int, int]:
 
     Parameters:
     a (bytes): The order executed message in bytes to be parsed.
+    offset (int): Position of the message body within a, defaults to 0.
 
     Returns:
     Tuple[int, int, int, int, int, int]: A tuple containing the parsed values.
     """
-    m = struct.unpack("!HH6sQIQ", a)
-    m = list(m)
-    m[2] = int.from_bytes(m[2], byteorder="big")
-    return tuple(m)
+    locate, tracking, ts_high, ts_low, ref, shares, match = _ORDER_EXECUTED.unpack_from(
+        a, offset
+    )
+    return (locate, tracking, ts_high << 32 | ts_low, ref, shares, match)
 
 
 # Message Type C
 def parse_order_executed_price(
     a: bytes,
+    offset: int = 0,
+    integer_prices: bool = False,
 ) -> Tuple[int, int, int, int, int, int, str, float]:
     """
     Parse an order executed price message.
@@ -175,24 +242,34 @@ def parse_order_executed_price(
     7. Printable
     8. Execution price
 
-    The execution price is converted from integer to floating-point by dividing by 10,000.
+    The execution price is converted from integer to floating-point by dividing by 10,000,
+    unless integer_prices is True, in which case it is kept in ticks of 1/10,000 dollar.
 
     Parameters:
     a (bytes): The order executed price message in bytes to be parsed.
+    offset (int): Position of the message body within a, defaults to 0.
+    integer_prices (bool): If True, the price is returned as an integer number of ticks.
 
     Returns:
     Tuple[int, int, int, int, int, int, str, float]: A tuple containing the parsed values.
     """
-    m = struct.unpack("!HH6sQIQcL", a)
-    m = list(m)
-    m[2] = int.from_bytes(m[2], byteorder="big")
-    m[6] = m[6].decode()
-    m[7] = float(m[7]) / 10000
-    return tuple(m)
+    locate, tracking, ts_high, ts_low, ref, shares, match, printable, price = (
+        _ORDER_EXECUTED_PRICE.unpack_from(a, offset)
+    )
+    return (
+        locate,
+        tracking,
+        ts_high << 32 | ts_low,
+        ref,
+        shares,
+        match,
+        printable.decode(),
+        price if integer_prices else price / PRICE_SCALE,
+    )
 
 
 # Message Type X
-def parse_order_cancel(a: bytes) -> Tuple[int, int, int, int, int]:
+def parse_order_cancel(a: bytes, offset: int = 0) -> Tuple[int, int, int, int, int]:
     """
     Parse an order cancel message.
 
@@ -206,18 +283,19 @@ def parse_order_cancel(a: bytes) -> Tuple[int, int, int, int, int]:
 
     Parameters:
     a (bytes): The order cancel message in bytes to be parsed.
+    offset (int): Position of the message body within a, defaults to 0.
 
     Returns:
     Tuple[int, int, int, int, int]: A tuple containing the parsed values.
     """
-    m = struct.unpack("!HH6sQI", a)
-    m = list(m)
-    m[2] = int.from_bytes(m[2], byteorder="big")
-    return tuple(m)
+    locate, tracking, ts_high, ts_low, ref, shares = _ORDER_CANCEL.unpack_from(
+        a, offset
+    )
+    return (locate, tracking, ts_high << 32 | ts_low, ref, shares)
 
 
 # Message Type D
-def parse_order_delete(a: bytes) -> Tuple[int, int, int, int]:
+def parse_order_delete(a: bytes, offset: int = 0) -> Tuple[int, int, int, int]:
     """
     Parse an order delete message.
 
@@ -230,18 +308,19 @@ def parse_order_delete(a: bytes) -> Tuple[int, int, int, int]:
 
     Parameters:
     a (bytes): The order delete message in bytes to be parsed.
+    offset (int): Position of the message body within a, defaults to 0.
 
     Returns:
     Tuple[int, int, int, int]: A tuple containing the parsed values.
     """
-    m = struct.unpack("!HH6sQ", a)
-    m = list(m)
-    m[2] = int.from_bytes(m[2], byteorder="big")
-    return tuple(m)
+    locate, tracking, ts_high, ts_low, ref = _ORDER_DELETE.unpack_from(a, offset)
+    return (locate, tracking, ts_high << 32 | ts_low, ref)
 
 
 # Message Type U
-def parse_order_replace(a: bytes) -> Tuple[int, int, int, int, int, int, float]:
+def parse_order_replace(
+    a: bytes, offset: int = 0, integer_prices: bool = False
+) -> Tuple[int, int, int, int, int, int, float]:
     """
     Parse an order replace message.
 
@@ -255,23 +334,35 @@ def parse_order_replace(a: bytes) -> Tuple[int, int, int, int, int, int, float]:
     6. Shares
     7. Price
 
-    The price is converted from integer to floating-point by dividing by 10,000.
+    The price is converted from integer to floating-point by dividing by 10,000,
+    unless integer_prices is True, in which case it is kept in ticks of 1/10,000 dollar.
 
     Parameters:
     a (bytes): The order replace message in bytes to be parsed.
+    offset (int): Position of the message body within a, defaults to 0.
+    integer_prices (bool): If True, the price is returned as an integer number of ticks.
 
     Returns:
     Tuple[int, int, int, int, int, int, float]: A tuple containing the parsed values.
     """
-    m = struct.unpack("!HH6sQQIL", a)
-    m = list(m)
-    m[2] = int.from_bytes(m[2], byteorder="big")
-    m[6] = float(m[6]) / 10000
-    return tuple(m)
+    locate, tracking, ts_high, ts_low, ref, new_ref, shares, price = (
+        _ORDER_REPLACE.unpack_from(a, offset)
+    )
+    return (
+        locate,
+        tracking,
+        ts_high << 32 | ts_low,
+        ref,
+        new_ref,
+        shares,
+        price if integer_prices else price / PRICE_SCALE,
+    )
 
 
 # Message Type P
-def parse_trade(a: bytes) -> Tuple[int, int, int, int, bytes, int, bytes, float, int]:
+def parse_trade(
+    a: bytes, offset: int = 0, integer_prices: bool = False
+) -> Tuple[int, int, int, int, bytes, int, bytes, float, int]:
     """
     Parse a trade message.
 
@@ -287,25 +378,37 @@ def parse_trade(a: bytes) -> Tuple[int, int, int, int, bytes, int, bytes, float,
     8. Price
     9. Match number
 
-    The price is converted from integer to floating-point by dividing by 10,000.
+    The price is converted from integer to floating-point by dividing by 10,000,
+    unless integer_prices is True, in which case it is kept in ticks of 1/10,000 dollar.
 
     Parameters:
     a (bytes): The trade message in bytes to be parsed.
+    offset (int): Position of the message body within a, defaults to 0.
+    integer_prices (bool): If True, the price is returned as an integer number of ticks.
 
     Returns:
     Tuple[int, int, int, int, str, int, bytes, float, int]: A tuple containing the parsed values.
     """
-    m = struct.unpack("!HH6sQcI8sLQ", a)
-    m = list(m)
-    m[2] = int.from_bytes(m[2], byteorder="big")
-    m[4] = m[4].decode()
-    m[6] = m[6].decode().strip()
-    m[7] = float(m[7]) / 10000
-    return tuple(m)
+    locate, tracking, ts_high, ts_low, ref, side, shares, stock, price, match = (
+        _TRADE.unpack_from(a, offset)
+    )
+    return (
+        locate,
+        tracking,
+        ts_high << 32 | ts_low,
+        ref,
+        side.decode(),
+        shares,
+        stock.decode().strip(),
+        price if integer_prices else price / PRICE_SCALE,
+        match,
+    )
 
 
 # Message Type Q
-def parse_cross_trade(a: bytes) -> Tuple[int, int, int, int, bytes, float, int, str]:
+def parse_cross_trade(
+    a: bytes, offset: int = 0, integer_prices: bool = False
+) -> Tuple[int, int, int, int, bytes, float, int, str]:
     """
     Parse a cross trade message.
 
@@ -320,17 +423,258 @@ def parse_cross_trade(a: bytes) -> Tuple[int, int, int, int, bytes, float, int,
     7. Match number
     8. Cross type
 
-    The cross price is converted from integer to floating-point by dividing by 10,000.
+    The cross price is converted from integer to floating-point by dividing by 10,000,
+    unless integer_prices is True, in which case it is kept in ticks of 1/10,000 dollar.
 
     Parameters:
     a (bytes): The cross trade message in bytes to be parsed.
+    offset (int): Position of the message body within a, defaults to 0.
+    integer_prices (bool): If True, the price is returned as an integer number of ticks.
 
     Returns:
     Tuple[int, int, int, int, bytes, float, int, str]: A tuple containing the parsed values.
     """
-    m = struct.unpack("!HH6sQ8sLQc", a)
-    m = list(m)
-    m[2] = int.from_bytes(m[2], byteorder="big")
-    m[4] = m[4].decode().strip()
-    m[5] = float(m[5]) / 10000
-    return tuple(m)
+    locate, tracking, ts_high, ts_low, shares, stock, price, match, cross_type = (
+        _CROSS_TRADE.unpack_from(a, offset)
+    )
+    return (
+        locate,
+        tracking,
+        ts_high << 32 | ts_low,
+        shares,
+        stock.decode().strip(),
+        price if integer_prices else price / PRICE_SCALE,
+        match,
+        cross_type,
+    )
+
+
+class MessageSpec(NamedTuple):
+    """
+    Layout of a parsed ITCH message type.
+
+    Attributes:
+    name (str): Name of the message type.
+    layout (struct.Struct): Precompiled layout of the message body.
+    length (int): Length of the message body in bytes, excluding the message type.
+    decoder (Callable[..., tuple]): Function parsing the message body, taking the buffer and an offset.
+    """
+
+    name: str
+    layout: struct.Struct
+    length: int
+    decoder: Callable[..., tuple]
+
+
+def _spec(
+    name: str, layout: struct.Struct, decoder: Callable[..., tuple]
+) -> MessageSpec:
+    return MessageSpec(name, layout, layout.size, decoder)
+
+
+# Registry of the parsed message types, keyed by message type
+MESSAGE_SPECS: Dict[bytes, MessageSpec] = {
+    b"R": _spec("stock_directory", _STOCK_DIRECTORY, parse_stock_directory),
+    b"A": _spec("add_order", _ADD_ORDER, parse_add_order),
+    b"F": _spec("add_order_with_mpid", _ADD_ORDER_WITH_MPID, parse_add_order_with_mpid),
+    b"E": _spec("order_executed", _ORDER_EXECUTED, parse_order_executed),
+    b"C": _spec(
+        "order_executed_price", _ORDER_EXECUTED_PRICE, parse_order_executed_price
+    ),
+    b"X": _spec("order_cancel", _ORDER_CANCEL, parse_order_cancel),
+    b"D": _spec("order_delete", _ORDER_DELETE, parse_order_delete),
+    b"U": _spec("order_replace", _ORDER_REPLACE, parse_order_replace),
+    b"P": _spec("trade", _TRADE, parse_trade),
+    b"Q": _spec("cross_trade", _CROSS_TRADE, parse_cross_trade),
+}
+
+
+# Bulk decoding: messages of one type are decoded at once into NumPy structured arrays.
+# Field names of each layout, in order; the timestamp is split as in the layouts.
+_FIELD_NAMES: Dict[bytes, Tuple[str, ...]] = {
+    b"A": ("stock_locate", "tracking_number", "timestamp_high", "timestamp_low", "order_ref_number", "buy_sell_indicator", "shares", "stock", "price"),
+    b"F": ("stock_locate", "tracking_number", "timestamp_high", "timestamp_low", "order_ref_number", "buy_sell_indicator", "shares", "stock", "price", "attribution"),
+    b"E": ("stock_locate", "tracking_number", "timestamp_high", "timestamp_low", "order_ref_number", "shares", "match_number"),
+    b"C": ("stock_locate", "tracking_number", "timestamp_high", "timestamp_low", "order_ref_number", "shares", "match_number", "printable", "price"),
+    b"X": ("stock_locate", "tracking_number", "timestamp_high", "timestamp_low", "order_ref_number", "shares"),
+    b"D": ("stock_locate", "tracking_number", "timestamp_high", "timestamp_low", "order_ref_number"),
+    b"U": ("stock_locate", "tracking_number", "timestamp_high", "timestamp_low", "order_ref_number", "new_order_ref_number", "shares", "price"),
+    b"P": ("stock_locate", "tracking_number", "timestamp_high", "timestamp_low", "order_ref_number", "buy_sell_indicator", "shares", "stock", "price", "match_number"),
+    b"Q": ("stock_locate", "tracking_number", "timestamp_high", "timestamp_low", "shares", "stock", "price", "match_number", "cross_type"),
+}  # fmt: skip
+
+# NumPy equivalents of the struct format characters used by the layouts
+_NUMPY_CODES = {"H": ">u2", "I": ">u4", "L": ">u4", "Q": ">u8", "c": "S1"}
+
+
+class MessageIndex(NamedTuple):
+    """
+    Position and type of every message in an ITCH file.
+
+    Attributes:
+    offsets (np.ndarray): Position of each message body (after the message type), as int64.
+    types (np.ndarray): Message type of each message, as uint8.
+    """
+
+    offsets: np.ndarray
+    types: np.ndarray
+
+
+def index_messages(buffer: Buffer) -> MessageIndex:
+    """
+    Scans an ITCH file once, following the length prefixes, to locate every message.
+
+    Parameters:
+    buffer (Buffer): Contents of the file, e.g. an mmap.mmap or bytes object.
+
+    Returns:
+    MessageIndex: The body offsets and types of all messages, in file order.
+
+    Raises:
+    ValueError: If the buffer ends in the middle of a message.
+    """
+    offsets = array("q")
+    types = bytearray()
+    append_offset = offsets.append
+    append_type = types.append
+    end = len(buffer)
+    position = 0
+    while position + 2 < end:
+        append_type(buffer[position + 2])
+        append_offset(position + 3)
+        position += 2 + ((buffer[position] << 8) | buffer[position + 1])
+    if position != end:
+        raise ValueError("The file ends with a truncated message.")
+    return MessageIndex(
+        np.frombuffer(offsets, dtype=np.int64), np.frombuffer(types, dtype=np.uint8)
+    )
+
+
+def message_locates(buffer: Buffer, offsets: np.ndarray) -> np.ndarray:
+    """
+    Reads the stock locate of messages, the first field of every message body.
+
+    Parameters:
+    buffer (Buffer): Contents of the file, e.g. an mmap.mmap or bytes object.
+    offsets (np.ndarray): Positions of the message bodies, e.g. from index_messages.
+
+    Returns:
+    np.ndarray: The stock locate of each message, as uint16.
+    """
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    locates = (data[offsets].astype(np.uint16) << 8) | data[offsets + 1]
+    # Release the buffer, so that a memory-mapped file can be closed
+    del data
+    return locates
+
+
+def _wire_dtype(message_type: bytes) -> np.dtype:
+    """
+    Builds the packed big-endian dtype matching the layout of a message type.
+    """
+    codes = []
+    layout = MESSAGE_SPECS[message_type].layout.format.lstrip("!")
+    count = ""
+    for char in layout:
+        if char.isdigit():
+            count += char
+        elif char == "s":
+            codes.append(f"S{count}")
+            count = ""
+        else:
+            codes.extend([_NUMPY_CODES[char]] * int(count or 1))
+            count = ""
+    return np.dtype(list(zip(_FIELD_NAMES[message_type], codes)))
+
+
+def _decoded_dtype(wire: np.dtype, integer_prices: bool = False) -> np.dtype:
+    """
+    Builds the native dtype of decoded messages from their wire dtype.
+    """
+    fields = []
+    for name in wire.names:
+        if name == "timestamp_high":
+            fields.append(("timestamp", np.uint64))
+        elif name == "price":
+            fields.append(("price", np.uint32 if integer_prices else np.float64))
+        elif name != "timestamp_low":
+            fields.append((name, wire[name].newbyteorder("=")))
+    return np.dtype(fields)
+
+
+def decode_message_array(
+    buffer: Buffer,
+    index: MessageIndex,
+    message_type: bytes,
+    chunk_size: int = 1 << 20,
+    integer_prices: bool = False,
+) -> np.ndarray:
+    """
+    Decodes all messages of one type at once into a structured array.
+
+    The message bodies are gathered from the buffer in chunks of chunk_size messages and
+    reinterpreted with a big-endian dtype matching the message layout, so no Python code
+    runs per message. The 48-bit timestamps are assembled into a single uint64 field, the
+    prices are converted to floating-point by dividing by 10,000 (or kept as uint32 ticks
+    with integer_prices), and the stock symbols have their padding stripped.
+
+    Parameters:
+    buffer (Buffer): Contents of the file, e.g. an mmap.mmap or bytes object.
+    index (MessageIndex): Index of the messages in buffer, from index_messages.
+    message_type (bytes): Type of the messages to decode, one of A, F, E, C, X, D, U, P, Q.
+    chunk_size (int): Number of messages gathered at a time, bounding temporary memory.
+    integer_prices (bool): If True, prices are kept as integer ticks of 1/10,000 dollar.
+
+    Returns:
+    np.ndarray: Structured array with one record per message, in file order.
+    """
+    wire = _wire_dtype(message_type)
+    offsets = index.offsets[index.types == message_type[0]]
+    decoded = np.empty(len(offsets), dtype=_decoded_dtype(wire, integer_prices))
+    raw = np.frombuffer(buffer, dtype=np.uint8)
+    columns = np.arange(wire.itemsize)
+    for start in range(0, len(offsets), chunk_size):
+        stop = start + chunk_size
+        records = raw[offsets[start:stop, None] + columns].view(wire).ravel()
+        chunk = decoded[start:stop]
+        for name in decoded.dtype.names:
+            if name == "timestamp":
+                chunk[name] = records["timestamp_high"].astype(np.uint64) << 32
+                chunk[name] |= records["timestamp_low"]
+            elif name == "price":
+                chunk[name] = (
+                    records["price"]
+                    if integer_prices
+                    else records["price"] / PRICE_SCALE
+                )
+            elif name == "stock":
+                chunk[name] = np.char.rstrip(records["stock"], b" ")
+            else:
+                chunk[name] = records[name]
+    return decoded
+
+
+def load_message_arrays(
+    path: str,
+    message_types: Iterable[bytes] = (b"A", b"F", b"E", b"C", b"X", b"D", b"U", b"P"),
+    integer_prices: bool = False,
+) -> Dict[bytes, np.ndarray]:
+    """
+    Decodes all messages of the given types in an ITCH file into structured arrays.
+
+    Parameters:
+    path (str): Path to the ITCH file.
+    message_types (Iterable[bytes]): Types of the messages to decode.
+    integer_prices (bool): If True, prices are kept as integer ticks of 1/10,000 dollar.
+
+    Returns:
+    Dict[bytes, np.ndarray]: Structured arrays of decoded messages, keyed by message type.
+    """
+    with map_file(path) as mapped:
+        index = index_messages(mapped)
+        return {
+            message_type: decode_message_array(
+                mapped, index, message_type, integer_prices=integer_prices
+            )
+            for message_type in message_types
+        }
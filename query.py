@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import os
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from delta_history import DeltaHistory, HistoryLevels
+from parse_itch5 import PRICE_SCALE
+from reconstruct import reconstruct_orderbook
+
+# Number of levels of a book rebuilt from a checkpoint, when the query does not give a depth
+DEFAULT_REPLAY_DEPTH = 10
+
+
+class BookSnapshot(NamedTuple):
+    """
+    State of an order book at a point in time.
+
+    Attributes:
+    timestamp (int): Time of the last recorded state up to the queried time, or the queried
+        time itself when the book was rebuilt from a checkpoint.
+    bids (List[Tuple[float, int]]): Price and shares of the buy levels, highest first.
+    asks (List[Tuple[float, int]]): Price and shares of the sell levels, lowest first.
+    """
+
+    timestamp: int
+    bids: List[Tuple[float, int]]
+    asks: List[Tuple[float, int]]
+
+
+def _levels(prices: np.ndarray, shares: np.ndarray) -> List[Tuple[float, int]]:
+    # Missing levels have a price of 0, and only follow the existing ones
+    present = prices != 0
+    return list(zip((prices[present] / PRICE_SCALE).tolist(), shares[present].tolist()))
+
+
+class HistoryStore:
+    def __init__(
+        self,
+        base_directory: str = "output",
+        path: Optional[str] = None,
+        checkpoint_directory: Optional[str] = None,
+    ) -> None:
+        """
+        Initializes a query layer over stored order book histories, answering point-in-time
+        and interval queries without loading whole days.
+
+        Histories are read from the delta files written by OrderBook.export_to_delta. Their
+        timestamps are memory-mapped and binary searched, and only the states around the
+        queried rows are decoded. Files are opened once and kept open, so repeated queries
+        cost a search and a small decode. When a symbol has no stored history, or a query asks
+        for more levels than were stored, the book is rebuilt from the nearest checkpoint of
+        the ITCH file instead, if path and checkpoint_directory are given.
+
+        Parameters:
+        base_directory (str): Base directory of the exports, with one folder per stock symbol.
+        path (str, optional): The path to the ITCH file the histories were reconstructed from.
+        checkpoint_directory (str, optional): Directory of the checkpoints of the ITCH file.
+        """
+        self.base_directory = base_directory
+        self.path = path
+        self.checkpoint_directory = checkpoint_directory
+        self._histories: Dict[str, Optional[DeltaHistory]] = {}
+
+    def history(self, symbol: str) -> Optional[DeltaHistory]:
+        """
+        Opens the stored history of a symbol.
+
+        Parameters:
+        symbol (str): Stock symbol.
+
+        Returns:
+        Optional[DeltaHistory]: The history, or None if it was not exported.
+        """
+        if symbol not in self._histories:
+            path = os.path.join(
+                self.base_directory, symbol, f"{symbol}_order_book_history.delta"
+            )
+            self._histories[symbol] = (
+                DeltaHistory(path) if os.path.exists(path) else None
+            )
+        return self._histories[symbol]
+
+    def book_at(
+        self, symbol: str, timestamp: int, depth: Optional[int] = None
+    ) -> Optional[BookSnapshot]:
+        """
+        Gets the order book of a symbol as it was at a time.
+
+        Parameters:
+        symbol (str): Stock symbol.
+        timestamp (int): Nanoseconds since midnight.
+        depth (int, optional): Number of levels on each side, all stored levels by default.
+
+        Returns:
+        Optional[BookSnapshot]: The book, or None if nothing was recorded up to timestamp (or
+        the symbol is not in the file, when rebuilt from a checkpoint).
+
+        Raises:
+        ValueError: If the query cannot be answered from the stored history, and there are
+            no checkpoints to rebuild the book from.
+        """
+        history = self.history(symbol)
+        if history is None or (depth is not None and depth > history.depth):
+            return self._replayed_book_at(symbol, timestamp, depth)
+        row = history.row_at(timestamp)
+        if row < 0:
+            return None
+        levels = history.read(row, row + 1)
+        depth = depth or history.depth
+        return BookSnapshot(
+            int(levels.timestamps[0]),
+            _levels(levels.buy_prices[0, :depth], levels.buy_shares[0, :depth]),
+            _levels(levels.sell_prices[0, :depth], levels.sell_shares[0, :depth]),
+        )
+
+    def book_range(
+        self,
+        symbol: str,
+        start_time: int,
+        end_time: int,
+        depth: Optional[int] = None,
+    ) -> HistoryLevels:
+        """
+        Gets the states of the order book of a symbol recorded during a time interval.
+
+        Parameters:
+        symbol (str): Stock symbol.
+        start_time (int): Start of the interval, in nanoseconds since midnight.
+        end_time (int): End of the interval, included.
+        depth (int, optional): Number of levels on each side, all stored levels by default.
+
+        Returns:
+        HistoryLevels: Timestamps, and prices (in integer ticks, 0 for missing levels) and
+        shares of the levels of each side, with shape (states, depth).
+
+        Raises:
+        ValueError: If the symbol has no stored history.
+        """
+        history = self.history(symbol)
+        if history is None:
+            raise ValueError(f"No stored history for {symbol}.")
+        rows = history.rows_between(start_time, end_time)
+        levels = history.read(rows.start, rows.stop)
+        if depth is None:
+            return levels
+        return HistoryLevels(
+            levels.timestamps,
+            levels.buy_prices[:, :depth],
+            levels.buy_shares[:, :depth],
+            levels.sell_prices[:, :depth],
+            levels.sell_shares[:, :depth],
+        )
+
+    def _replayed_book_at(
+        self, symbol: str, timestamp: int, depth: Optional[int]
+    ) -> Optional[BookSnapshot]:
+        """
+        Rebuilds the order book of a symbol at a time, by replaying the ITCH file from the
+        latest checkpoint before it.
+        """
+        if self.path is None or self.checkpoint_directory is None:
+            raise ValueError(
+                f"Cannot rebuild the book of {symbol}: there is no stored history deep "
+                "enough, and no checkpoints."
+            )
+        depth = depth or DEFAULT_REPLAY_DEPTH
+        books = reconstruct_orderbook(
+            self.path,
+            {symbol},
+            depth,
+            use_mmap=True,
+            show_progress=False,
+            start_time=timestamp,
+            end_time=timestamp,
+            checkpoint_directory=self.checkpoint_directory,
+            resume=True,
+        )
+        if not books:
+            return None
+        book = next(iter(books.values()))
+        # Processing stopped after timestamp, the book holds every order placed up to it
+        return BookSnapshot(
+            timestamp,
+            [
+                (book._export_price(price), shares)
+                for price, shares in book._accumulate_order_levels(book.buy_levels)
+            ],
+            [
+                (book._export_price(price), shares)
+                for price, shares in book._accumulate_order_levels(book.sell_levels)
+            ],
+        )
@@ -1,16 +1,58 @@
 from __future__ import annotations
 
 import os
-from typing import Dict
+from typing import Callable, Dict, Iterable, Optional, Sequence
 
+import numpy as np
 from tqdm import tqdm
 
 import parse_itch5 as itch
+from bbo_book import BBOBook
+from checkpoint import (
+    checkpoint_path,
+    find_checkpoint,
+    restore_orders,
+    write_checkpoint,
+)
+from itch_index import ItchIndex
+from itch_reader import (
+    Buffer,
+    iter_message_offsets,
+    iter_messages,
+    iter_selected_messages,
+    map_file,
+)
+from order_store import ArrayOrderStore
 from orderbook import Order, OrderBook
+from sinks import DEFAULT_BUFFER_LIMIT, SINKS, SpillBudget
 
 
 def reconstruct_orderbook(
-    path: str, selected_symbols: set, depth: int = 3
+    path: str,
+    selected_symbols: set,
+    depth: int = 3,
+    use_mmap: bool = False,
+    integer_prices: bool = False,
+    array_order_store: bool = False,
+    skip_unchanged: bool = False,
+    columnar: bool = False,
+    sink_directory: Optional[str] = None,
+    sink_format: str = "csv",
+    message_offsets: Optional[Iterable[int]] = None,
+    show_progress: bool = True,
+    index_path: Optional[str] = None,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+    checkpoint_directory: Optional[str] = None,
+    checkpoint_interval: Optional[int] = None,
+    resume: bool = False,
+    sample_interval: Optional[int] = None,
+    sample_events: Optional[int] = None,
+    bar_sizes: Sequence[int] = (),
+    feature_levels: Optional[int] = None,
+    on_book: Optional[Callable[[OrderBook], None]] = None,
+    bbo_only: bool = False,
+    sink_buffer_limit: int = DEFAULT_BUFFER_LIMIT,
 ) -> Dict[str, OrderBook]:
     """
     Reconstructs the order book from a binary file containing ITCH messages.
@@ -19,12 +61,73 @@ def reconstruct_orderbook(
         path (str): The path to the binary file.
         selected_symbols (set): A set of selected symbols to reconstruct the order book for.
         depth (int, optional): The depth of the order book. Defaults to 3.
+        use_mmap (bool, optional): If True, the file is memory-mapped and messages are parsed
+            in place instead of being read in blocks. Defaults to False.
+        integer_prices (bool, optional): If True, prices are kept as integer ticks of 1/10,000
+            dollar in the order books and their histories, and only converted on export.
+            Defaults to False.
+        array_order_store (bool, optional): If True, the orders of all books are kept in a
+            shared ArrayOrderStore indexed by order reference number instead of dictionaries
+            of Order objects. Requires integer_prices. Defaults to False.
+        skip_unchanged (bool, optional): If True, states are only recorded when the levels up to
+            depth change. Defaults to False.
+        columnar (bool, optional): If True, histories are kept in preallocated NumPy columns.
+            Defaults to False.
+        sink_directory (str, optional): If given, the histories of every book are streamed in
+            batches to files under this directory while the file is processed, instead of
+            being kept in memory, with the layout of the corresponding export. Cannot be
+            combined with columnar. Defaults to None.
+        sink_format (str, optional): Format of the streamed histories, "csv" or "parquet".
+            Defaults to "csv".
+        message_offsets (Iterable[int], optional): If given, only the messages with bodies at
+            these positions in the file are processed, in the given order, from the
+            memory-mapped file. They must include the stock directory messages of the
+            selected symbols. Defaults to None.
+        show_progress (bool, optional): If False, no progress bar is shown. Defaults to True.
+        index_path (str, optional): Path of the file's sidecar index, built by
+            itch_index.build_index. If given, only the messages of the selected stocks are
+            read, at the offsets recorded in the index. Defaults to None.
+        start_time (int, optional): If given, in nanoseconds since midnight, the messages before
+            it update the order books without recording their states or trades. Defaults to None.
+        end_time (int, optional): If given, in nanoseconds since midnight, processing stops at
+            the first message of a selected stock after it. Defaults to None.
+        checkpoint_directory (str, optional): Directory of the checkpoints of the live orders
+            of the books and the position reached in the file, see checkpoint.py. Defaults to None.
+        checkpoint_interval (int, optional): If given, a checkpoint is written to
+            checkpoint_directory whenever this many nanoseconds of ITCH time have passed, from
+            the memory-mapped file. Defaults to None.
+        resume (bool, optional): If True, processing resumes from the latest checkpoint of
+            checkpoint_directory holding the selected symbols, at or before start_time if it is
+            given, instead of the start of the file. The histories then start at the checkpoint,
+            so they cannot be streamed to sink_directory. Defaults to False.
+        sample_interval (int, optional): If given, states are recorded on a clock grid of this
+            many nanoseconds instead of after every message, see OrderBook. With end_time, the
+            grid runs up to end_time. Defaults to None.
+        sample_events (int, optional): If given, a state is only recorded after every
+            sample_events messages of a book. Defaults to None.
+        bar_sizes (Sequence[int], optional): Time spans in nanoseconds of OHLCV and VWAP bars
+            built from the trades of each book during the replay, in the books' bars and the
+            sink's files. Defaults to ().
+        feature_levels (int, optional): If given, top of book features are updated after every
+            message of each book, in the books' features, with the imbalance computed over this
+            many levels. Defaults to None.
+        on_book (Callable[[OrderBook], None], optional): Called with each order book when it
+            is created, e.g. to subscribe callbacks to its events with OrderBook.subscribe.
+            Defaults to None.
+        bbo_only (bool, optional): If True, the books are BBOBooks, which only track the best
+            bid and offer, and record their changes as histories of depth 1. Defaults to False.
+        sink_buffer_limit (int, optional): Largest number of records buffered by the sinks of
+            all books together, the largest buffers being written out beyond it. Defaults to
+            DEFAULT_BUFFER_LIMIT.
 
     Returns:
         dict: A dictionary of order books, keyed by stock locate number.
 
     Raises:
         FileNotFoundError: If the specified file path does not exist.
+        ValueError: If array_order_store is set without integer_prices, sink_format is unknown,
+            the index or the checkpoint does not match the file, checkpoints are requested
+            without checkpoint_directory, resume is combined with sink_directory, or bbo_only is combined with an unsupported option.
 
     Example:
         >>> path = "/path/to/data/01302019.NASDAQ_ITCH50"
@@ -34,112 +137,256 @@ def reconstruct_orderbook(
     """
     if not os.path.exists(path):
         raise FileNotFoundError("The specified file path does not exist.")
+    if array_order_store and not integer_prices:
+        raise ValueError("The array order store requires integer prices.")
+    if sink_directory is not None and sink_format not in SINKS:
+        raise ValueError(f"Unknown sink format: {sink_format}")
+    if (checkpoint_interval is not None or resume) and checkpoint_directory is None:
+        raise ValueError("Checkpoints require a checkpoint directory.")
+    if resume and sink_directory is not None:
+        # New sinks would overwrite the files streamed before the checkpoint, and the rows
+        # streamed after it are not recorded by the checkpoint to be truncated
+        raise ValueError(
+            "Resuming from a checkpoint cannot stream to a sink directory."
+        )
+    if bbo_only:
+        if array_order_store or feature_levels is not None:
+            raise ValueError(
+                "BBO books support neither the array order store nor features."
+            )
+        if sample_interval is not None or sample_events is not None:
+            raise ValueError("BBO books record BBO changes, they cannot be sampled.")
+        depth = 1
+    if checkpoint_interval is not None:
+        os.makedirs(checkpoint_directory, exist_ok=True)
+        # Checkpoints record the file position of messages, which needs the mapped file
+        use_mmap = True
+    if index_path is not None:
+        index = ItchIndex(index_path, path)
+        message_offsets = index.message_offsets(index.locates(selected_symbols))
 
     # Set of stock locate numbers for selected stocks, taken from the stock directory message (R)
     selected_stocks = set()
     # Dictionary of order books, which will be keyed by stock locate number
     order_book = {}
+    # Columns holding the orders of all books, when they are not kept as Order objects
+    order_store = ArrayOrderStore() if array_order_store else None
+    # Bound on the records buffered by the sinks of all books together
+    sink_budget = SpillBudget(sink_buffer_limit)
+    # Whether states and trades are recorded, False until the start of the time window
+    recording = start_time is None
 
-    with open(path, "rb") as binary:
-        total_size = os.path.getsize(path)
-        progress_bar = tqdm(
-            total=total_size, unit="B", unit_scale=True, desc="Processing File"
+    def new_book(locate: int, symbol: str) -> OrderBook:
+        selected_stocks.add(locate)
+        sink = (
+            SINKS[sink_format](
+                sink_directory, symbol, depth, integer_prices, budget=sink_budget
+            )
+            if sink_directory is not None
+            else None
         )
-        message_type = binary.read(1)
-        while message_type:
-            a = b""
-            if message_type == b"S":
-                a = binary.read(11)  # System Event Message
-            elif message_type == b"R":
-                a = binary.read(38)  # Stock Directory Message
-                m = itch.parse_stock_directory(a)
-                if m[3] in selected_symbols:
-                    selected_stocks.add(m[0])
-                    order_book[m[0]] = OrderBook(m[3], depth)
-                    # print("Symbol:", m[3], "Locate: ", m[0])
-            elif message_type == b"H":
-                a = binary.read(24)  # Stock Trading Action Message
-            elif message_type == b"Y":
-                a = binary.read(19)  # Reg SHO Restriction Message
-            elif message_type == b"L":
-                a = binary.read(25)  # Market Participant Position Message
-            elif message_type == b"V":
-                a = binary.read(34)  # MWCB Decline Level Message
-            elif message_type == b"W":
-                a = binary.read(11)  # MWCB Status Message
-            elif message_type == b"K":
-                a = binary.read(27)  # IPO Quoting Period Update Message
-            elif message_type == b"J":
-                a = binary.read(34)  # Limit Up-Limit Down Auction Collar Message
-            elif message_type == b"h":
-                a = binary.read(20)  # Operational Halt Message
-            elif message_type == b"A":
-                a = binary.read(35)  # Add Order Message
-                m = itch.parse_add_order(a)
-                if m[0] in selected_stocks:
-                    order = Order(m[2], m[3], m[4], m[5], m[7])
-                    order_book[m[0]].add_order(order)
-                    order_book[m[0]].record_state(m[2])
-            elif message_type == b"F":
-                a = binary.read(39)  # Add Order with MPID Message
-                m = itch.parse_add_order_with_mpid(a)
-                if m[0] in selected_stocks:
-                    order = Order(m[2], m[3], m[4], m[5], m[7])
-                    order_book[m[0]].add_order(order)
-                    order_book[m[0]].record_state(m[2])
-            elif message_type == b"E":
-                a = binary.read(30)  # Order Executed Message
-                m = itch.parse_order_executed(a)
-                if m[0] in selected_stocks:
-                    order_book[m[0]].process_trade(m[2], m[3], m[4])
-                    order_book[m[0]].record_state(m[2])
-            elif message_type == b"C":
-                a = binary.read(35)  # Order Executed with Price Message
-                m = itch.parse_order_executed_price(a)
-                if m[0] in selected_stocks:
-                    order_book[m[0]].process_trade(m[2], m[3], m[4], m[7], m[6] == "Y")
-                    order_book[m[0]].record_state(m[2])
-            elif message_type == b"X":
-                a = binary.read(22)  # Order Cancel Message
-                m = itch.parse_order_cancel(a)
-                if m[0] in selected_stocks:
-                    order = order_book[m[0]].orders[m[3]]
-                    order.update_order(None, order.shares - m[4], None)
-                    order_book[m[0]].record_state(m[2])
-            elif message_type == b"D":
-                a = binary.read(18)  # Order Delete Message
-                m = itch.parse_order_delete(a)
-                if m[0] in selected_stocks:
-                    order_book[m[0]].remove_order(m[3])
-                    order_book[m[0]].record_state(m[2])
-            elif message_type == b"U":
-                a = binary.read(34)  # Order Replace Message
-                m = itch.parse_order_replace(a)
-                if m[0] in selected_stocks:
-                    og = order_book[m[0]].orders[m[3]]
-                    order_book[m[0]].remove_order(og.order_ref_number)
-                    order_book[m[0]].add_order(
-                        Order(m[2], m[4], og.buy_sell_indicator, m[5], m[6])
-                    )
-                    order_book[m[0]].record_state(m[2])
-            elif message_type == b"P":
-                a = binary.read(43)  # Trade Message
-                m = itch.parse_trade(a)
-                if m[0] in selected_stocks:
-                    order_book[m[0]].record_trade(m[2], m[5], m[7])
-            elif message_type == b"Q":
-                a = binary.read(39)  # Cross Trade Message
-                m = itch.parse_cross_trade(a)
-                if m[0] in selected_stocks:
-                    order_book[m[0]].record_trade(m[2], m[3], m[5])
-            elif message_type == b"B":
-                a = binary.read(18)  # NOII Message
-            elif message_type == b"I":
-                a = binary.read(49)  # Net Order Imbalance Indicator (NOII) Message
-
-            progress_bar.update(len(a) + 1)
-
-            message_type = binary.read(1)
+        if bbo_only:
+            book = BBOBook(symbol, integer_prices, columnar, sink, bar_sizes)
+        else:
+            book = OrderBook(
+                symbol,
+                depth,
+                integer_prices,
+                order_store.view(locate) if order_store is not None else None,
+                skip_unchanged,
+                columnar,
+                sink,
+                sample_interval,
+                sample_events,
+                bar_sizes,
+                feature_levels,
+            )
+        order_book[locate] = book
+        book.recording = recording
+        if on_book is not None:
+            on_book(book)
+        return book
+
+    def stock_directory(a: Buffer, offset: int) -> None:
+        m = itch.parse_stock_directory(a, offset)
+        if m[3] in selected_symbols:
+            new_book(m[0], m[3])
+            # print("Symbol:", m[3], "Locate: ", m[0])
+
+    def add_order(a: Buffer, offset: int) -> None:
+        m = itch.parse_add_order(a, offset, integer_prices)
+        order = Order(m[2], m[3], m[4], m[5], m[7])
+        order_book[m[0]].add_order(order)
+        order_book[m[0]].record_state(m[2])
+
+    def add_order_with_mpid(a: Buffer, offset: int) -> None:
+        m = itch.parse_add_order_with_mpid(a, offset, integer_prices)
+        order = Order(m[2], m[3], m[4], m[5], m[7])
+        order_book[m[0]].add_order(order)
+        order_book[m[0]].record_state(m[2])
+
+    def order_executed(a: Buffer, offset: int) -> None:
+        m = itch.parse_order_executed(a, offset)
+        order_book[m[0]].process_trade(m[2], m[3], m[4])
+        order_book[m[0]].record_state(m[2])
+
+    def order_executed_price(a: Buffer, offset: int) -> None:
+        m = itch.parse_order_executed_price(a, offset, integer_prices)
+        order_book[m[0]].process_trade(m[2], m[3], m[4], m[7], m[6] == "Y")
+        order_book[m[0]].record_state(m[2])
+
+    def order_cancel(a: Buffer, offset: int) -> None:
+        m = itch.parse_order_cancel(a, offset)
+        order_book[m[0]].cancel_order(m[3], m[4], m[2])
+        order_book[m[0]].record_state(m[2])
+
+    def order_delete(a: Buffer, offset: int) -> None:
+        m = itch.parse_order_delete(a, offset)
+        order_book[m[0]].remove_order(m[3], m[2])
+        order_book[m[0]].record_state(m[2])
+
+    def order_replace(a: Buffer, offset: int) -> None:
+        m = itch.parse_order_replace(a, offset, integer_prices)
+        order_book[m[0]].replace_order(m[2], m[3], m[4], m[5], m[6])
+        order_book[m[0]].record_state(m[2])
+
+    def trade(a: Buffer, offset: int) -> None:
+        m = itch.parse_trade(a, offset, integer_prices)
+        order_book[m[0]].record_trade(m[2], m[5], m[7])
+
+    def cross_trade(a: Buffer, offset: int) -> None:
+        m = itch.parse_cross_trade(a, offset, integer_prices)
+        order_book[m[0]].record_trade(m[2], m[3], m[5])
+
+    # Message handlers keyed by message type. Messages that do not affect the order book
+    # (S, H, Y, L, V, W, K, J, h, B, I, N) have no handler and are skipped without being parsed.
+    # Order book messages are only parsed if their stock is selected: the stock locate is
+    # peeked from the first two bytes of the body, so other stocks' messages are never decoded
+    handlers: Dict[bytes, Callable[[Buffer, int], None]] = {
+        b"R": stock_directory,  # Stock Directory Message
+        b"A": add_order,  # Add Order Message
+        b"F": add_order_with_mpid,  # Add Order with MPID Message
+        b"E": order_executed,  # Order Executed Message
+        b"C": order_executed_price,  # Order Executed with Price Message
+        b"X": order_cancel,  # Order Cancel Message
+        b"D": order_delete,  # Order Delete Message
+        b"U": order_replace,  # Order Replace Message
+        b"P": trade,  # Trade Message
+        b"Q": cross_trade,  # Cross Trade Message
+    }
+    get_handler = handlers.get
+
+    total_size = os.path.getsize(path)
+    # Time from which the next checkpoint is written, set by the first message
+    next_checkpoint = -1
+
+    def check_time(a: Buffer, offset: int) -> bool:
+        """
+        Checks the time window and the checkpoint interval against the timestamp of a message,
+        peeked without parsing it, before the message is processed.
+
+        Returns:
+        bool: False once the message is past the end of the window.
+        """
+        nonlocal recording, next_checkpoint
+        timestamp = itch.peek_timestamp(a, offset)
+        if end_time is not None and timestamp > end_time:
+            return False
+        if not recording and start_time is not None and timestamp >= start_time:
+            recording = True
+            for book in order_book.values():
+                book.recording = True
+        if checkpoint_interval is not None and timestamp >= next_checkpoint:
+            if next_checkpoint >= 0:
+                write_checkpoint(
+                    checkpoint_path(checkpoint_directory, timestamp),
+                    order_book,
+                    selected_symbols,
+                    total_size,
+                    offset - 3,
+                    timestamp,
+                )
+            next_checkpoint = (
+                timestamp // checkpoint_interval + 1
+            ) * checkpoint_interval
+        return True
+
+    timed = (
+        check_time
+        if start_time is not None
+        or end_time is not None
+        or checkpoint_interval is not None
+        else None
+    )
+
+    # Position of the length prefix of the first message to process
+    resume_offset = 0
+    if resume:
+        checkpoint = find_checkpoint(checkpoint_directory, selected_symbols, start_time)
+        if checkpoint is not None:
+            if checkpoint.file_size != total_size:
+                raise ValueError("The checkpoint does not match the file.")
+            for locate, (symbol, orders) in checkpoint.orders.items():
+                if symbol in selected_symbols:
+                    restore_orders(new_book(locate, symbol), orders)
+            resume_offset = checkpoint.file_offset
+            if message_offsets is not None:
+                message_offsets = np.asarray(message_offsets)
+                message_offsets = message_offsets[message_offsets > resume_offset]
+    progress_bar = tqdm(
+        total=total_size,
+        unit="B",
+        unit_scale=True,
+        desc="Processing File",
+        disable=not show_progress,
+        initial=resume_offset,
+    )
+    try:
+        if message_offsets is not None and total_size > 0:
+            with map_file(path) as mapped:
+                for message_type, offset in iter_selected_messages(
+                    mapped, message_offsets, progress=progress_bar.update
+                ):
+                    handler = get_handler(message_type)
+                    if handler is not None and (
+                        ((mapped[offset] << 8) | mapped[offset + 1]) in selected_stocks
+                        or message_type == b"R"
+                    ):
+                        if timed is not None and not timed(mapped, offset):
+                            break
+                        handler(mapped, offset)
+        elif use_mmap and total_size > 0:
+            # Messages are parsed in place from the mapping, without copying them out of it
+            with map_file(path) as mapped:
+                for message_type, offset in iter_message_offsets(
+                    mapped, resume_offset, progress=progress_bar.update
+                ):
+                    handler = get_handler(message_type)
+                    if handler is not None and (
+                        ((mapped[offset] << 8) | mapped[offset + 1]) in selected_stocks
+                        or message_type == b"R"
+                    ):
+                        if timed is not None and not timed(mapped, offset):
+                            break
+                        handler(mapped, offset)
+        else:
+            with open(path, "rb") as binary:
+                binary.seek(resume_offset)
+                for message_type, a in iter_messages(
+                    binary, progress=progress_bar.update
+                ):
+                    handler = get_handler(message_type)
+                    if handler is not None and (
+                        ((a[0] << 8) | a[1]) in selected_stocks or message_type == b"R"
+                    ):
+                        if timed is not None and not timed(a, 0):
+                            break
+                        handler(a, 0)
+    finally:
+        # Streamed histories are completed even if processing stops early, and sampled
+        # histories are carried forward to the end of the time window
+        for book in order_book.values():
+            book.close(end_time)
 
     progress_bar.close()
     return order_book
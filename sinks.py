@@ -0,0 +1,341 @@
+from __future__ import annotations
+
+import csv
+import os
+from abc import ABC, abstractmethod
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple, Type
+
+from bars import Bar, bar_name
+from history import history_header
+from orderbook import _history_rows_table, _import_pyarrow, _trade_rows_table
+from parse_itch5 import PRICE_SCALE
+
+# Number of records buffered in memory before they are written out
+DEFAULT_BATCH_SIZE = 1 << 16
+# Largest number of records buffered by all the sinks of a reconstruction together
+DEFAULT_BUFFER_LIMIT = 1 << 21
+
+
+class SpillBudget:
+    def __init__(self, limit: int = DEFAULT_BUFFER_LIMIT) -> None:
+        """
+        Initializes a bound on the records buffered by many SpillBuffers together, so that the
+        memory of the buffers does not grow with the number of sinks.
+
+        When the buffers hold more than limit records in total, the largest ones are written
+        out until at most half of limit records are buffered.
+
+        Parameters:
+        limit (int): Largest number of records buffered in total.
+
+        Attributes:
+        size (int): Number of records currently buffered.
+        buffers (List[SpillBuffer]): The buffers sharing the budget.
+        """
+        self.limit = limit
+        self.size = 0
+        self.buffers: List[SpillBuffer] = []
+
+    def spill(self) -> None:
+        """
+        Writes out the largest buffers until at most half of the limit is buffered.
+        """
+        for buffer in sorted(self.buffers, key=lambda buffer: -len(buffer.rows)):
+            if self.size <= self.limit // 2:
+                break
+            buffer.flush()
+
+    def release(self, buffer: SpillBuffer) -> None:
+        """
+        Removes a flushed buffer from the budget, e.g. when its sink is closed.
+        """
+        self.buffers.remove(buffer)
+        buffer.budget = None
+
+
+class SpillBuffer:
+    __slots__ = ("rows", "batch_size", "written", "budget", "_write")
+
+    def __init__(
+        self,
+        batch_size: int,
+        write: Callable[[list], None],
+        budget: Optional[SpillBudget] = None,
+    ) -> None:
+        """
+        Initializes a list-like buffer of records which writes them out in batches.
+
+        Parameters:
+        batch_size (int): Number of records buffered before they are written.
+        write (Callable[[list], None]): Called with each full batch of records.
+        budget (SpillBudget, optional): Bound on the records buffered along with other buffers.
+        """
+        self.rows: list = []
+        self.batch_size = batch_size
+        self.written = 0
+        self.budget = budget
+        self._write = write
+        if budget is not None:
+            budget.buffers.append(self)
+
+    def append(self, row) -> None:
+        rows = self.rows
+        rows.append(row)
+        budget = self.budget
+        if budget is not None:
+            budget.size += 1
+            if budget.size > budget.limit:
+                budget.spill()
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes out the buffered records.
+        """
+        if self.rows:
+            self._write(self.rows)
+            self.written += len(self.rows)
+            if self.budget is not None:
+                self.budget.size -= len(self.rows)
+            self.rows = []
+
+    def __len__(self) -> int:
+        return self.written + len(self.rows)
+
+
+class HistorySink(ABC):
+    def __init__(
+        self,
+        base_directory: str,
+        stock_symbol: str,
+        depth: int,
+        integer_prices: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        budget: Optional[SpillBudget] = None,
+    ) -> None:
+        """
+        Initializes a sink streaming the order book and trade history of one stock to disk.
+
+        An OrderBook given the sink appends its states and trades to the sink's buffers instead
+        of keeping them, and every batch_size records are written out, so the memory used by
+        the histories stays bounded however long the replay. When many stocks are streamed,
+        their sinks share a budget bounding the records buffered in total, and files are only
+        opened while a batch is written, so neither memory nor open files grow with the number
+        of stocks. The files have the paths and columns of the corresponding OrderBook export.
+
+        Parameters:
+        base_directory (str): Base directory path to create the stock symbol folder and save the files.
+        stock_symbol (str): Symbol of the stock.
+        depth (int): Depth of price levels recorded by the order book.
+        integer_prices (bool): If True, the recorded prices are integer ticks, converted when written.
+        batch_size (int): Number of states, or trades, buffered before they are written.
+        budget (SpillBudget, optional): Bound on the records buffered along with other sinks.
+
+        Attributes:
+        states (SpillBuffer): Buffer of the order book states, used as the book's order_book_history.
+        trades (SpillBuffer): Buffer of the trades, used as the book's trades.
+        bar_buffers (Dict[int, SpillBuffer]): Buffers of the bars of each size, see bars.
+        """
+        self.directory = os.path.join(base_directory, stock_symbol)
+        os.makedirs(self.directory, exist_ok=True)
+        self.stock_symbol = stock_symbol
+        self.header = history_header(depth)
+        self.integer_prices = integer_prices
+        self.batch_size = batch_size
+        self.budget = budget
+        self.states = SpillBuffer(batch_size, self._write_states, budget)
+        self.trades = SpillBuffer(batch_size, self._write_trades, budget)
+        self.bar_buffers: Dict[int, SpillBuffer] = {}
+
+    def _path(self, name: str, extension: str) -> str:
+        return f"{self.directory}/{self.stock_symbol}_{name}.{extension}"
+
+    @abstractmethod
+    def _write_states(self, rows: List[List[Optional[float]]]) -> None:
+        """
+        Writes a batch of order book states, in the layout of the CSV export.
+        """
+
+    @abstractmethod
+    def _write_trades(self, trades: List[Tuple[int, int, float]]) -> None:
+        """
+        Writes a batch of trades.
+        """
+
+    @abstractmethod
+    def _write_bars(self, name: str, bars: List[Bar]) -> None:
+        """
+        Writes a batch of bars to the file of the given name, see bar_name.
+        """
+
+    def bars(self, bar_size: int) -> SpillBuffer:
+        """
+        Gets the buffer of the bars of a size, written to a file named after bar_name.
+
+        Parameters:
+        bar_size (int): Time span of the bars in nanoseconds.
+
+        Returns:
+        SpillBuffer: Buffer of the bars, appended to by a BarBuilder.
+        """
+        if bar_size not in self.bar_buffers:
+            # A partial rather than a closure, so that books with bars can be pickled
+            # back from the worker processes of a parallel reconstruction
+            self.bar_buffers[bar_size] = SpillBuffer(
+                self.batch_size,
+                partial(self._write_bars, bar_name(bar_size)),
+                self.budget,
+            )
+        return self.bar_buffers[bar_size]
+
+    def _buffers(self) -> List[SpillBuffer]:
+        return [self.states, self.trades, *self.bar_buffers.values()]
+
+    def flush(self) -> None:
+        """
+        Writes out the buffered states, trades and bars.
+        """
+        for buffer in self._buffers():
+            buffer.flush()
+
+    def close(self) -> None:
+        """
+        Writes out the buffered states, trades and bars and completes the files.
+        """
+        self.flush()
+        # Histories which never received a record are written as empty files
+        if not self.states.written:
+            self._write_states([])
+        if not self.trades.written:
+            self._write_trades([])
+        for bar_size, buffer in self.bar_buffers.items():
+            if not buffer.written:
+                self._write_bars(bar_name(bar_size), [])
+        if self.budget is not None:
+            for buffer in self._buffers():
+                self.budget.release(buffer)
+            self.budget = None
+
+    def __enter__(self) -> HistorySink:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class CSVHistorySink(HistorySink):
+    def __init__(self, *args, **kwargs) -> None:
+        """
+        Initializes a sink writing the histories to the CSV files of OrderBook.export_to_csv,
+        each batch being appended to its file. Takes the parameters of HistorySink.
+        """
+        super().__init__(*args, **kwargs)
+        # Names of the files already created, with their header
+        self._created = set()
+
+    def _append(self, name: str, header: List[str], rows: list) -> None:
+        created = name in self._created
+        with open(self._path(name, "csv"), "a" if created else "w", newline="") as file:
+            writer = csv.writer(file)
+            if not created:
+                writer.writerow(header)
+                self._created.add(name)
+            writer.writerows(rows)
+
+    def _write_states(self, rows: List[List[Optional[float]]]) -> None:
+        if self.integer_prices:
+            # Prices are at every odd position of the records: timestamp, price, shares, ...
+            for row in rows:
+                row[1::2] = [
+                    None if price is None else price / PRICE_SCALE
+                    for price in row[1::2]
+                ]
+        self._append("order_book_history", self.header, rows)
+
+    def _write_trades(self, trades: List[Tuple[int, int, float]]) -> None:
+        if self.integer_prices:
+            trades = [
+                (timestamp, shares, price / PRICE_SCALE)
+                for timestamp, shares, price in trades
+            ]
+        self._append("trades", ["timestamp", "shares", "prices"], trades)
+
+    def _write_bars(self, name: str, bars: List[Bar]) -> None:
+        self._append(name, list(Bar._fields), bars)
+
+
+class ParquetHistorySink(HistorySink):
+    def __init__(self, *args, compression: str = "zstd", **kwargs) -> None:
+        """
+        Initializes a sink writing the histories to the Parquet files of
+        OrderBook.export_to_parquet, one row group per batch. Takes the parameters of
+        HistorySink, and the compression codec of the columns.
+
+        A Parquet file cannot be appended to once closed, so each batch is written to a part
+        file next to the final one, and the parts are gathered into the final file, one row
+        group each, when the sink is closed.
+        """
+        super().__init__(*args, **kwargs)
+        self.compression = compression
+        # Paths of the part files written so far, keyed by the name of their history
+        self._parts: Dict[str, List[str]] = {}
+
+    def _write_part(self, name: str, table) -> None:
+        _, pq = _import_pyarrow()
+        parts = self._parts.setdefault(name, [])
+        path = f"{self._path(name, 'parquet')}.part{len(parts)}"
+        pq.write_table(table, path, compression=self.compression)
+        parts.append(path)
+
+    def _write_states(self, rows: List[List[Optional[float]]]) -> None:
+        table = _history_rows_table(rows, self.header, self.integer_prices)
+        self._write_part("order_book_history", table)
+
+    def _write_trades(self, trades: List[Tuple[int, int, float]]) -> None:
+        table = _trade_rows_table(trades, self.integer_prices)
+        self._write_part("trades", table)
+
+    def _write_bars(self, name: str, bars: List[Bar]) -> None:
+        pa, _ = _import_pyarrow()
+        columns = list(zip(*bars)) or [()] * len(Bar._fields)
+        table = pa.table(
+            [
+                pa.array(column, type=dtype)
+                for column, dtype in zip(
+                    columns,
+                    (pa.int64(),)
+                    + (pa.float64(),) * 4
+                    + (pa.uint64(), pa.float64(), pa.uint32()),
+                )
+            ],
+            names=list(Bar._fields),
+        )
+        self._write_part(name, table)
+
+    def close(self) -> None:
+        super().close()
+        _, pq = _import_pyarrow()
+        for name, parts in self._parts.items():
+            if len(parts) == 1:
+                os.replace(parts[0], self._path(name, "parquet"))
+                continue
+            tables = (pq.read_table(part) for part in parts)
+            first = next(tables)
+            with pq.ParquetWriter(
+                self._path(name, "parquet"), first.schema, compression=self.compression
+            ) as writer:
+                writer.write_table(first)
+                for table in tables:
+                    writer.write_table(table)
+            for part in parts:
+                os.remove(part)
+        self._parts = {}
+
+
+# Sinks by the name of their format, for reconstruct_orderbook
+SINKS: Dict[str, Type[HistorySink]] = {
+    "csv": CSVHistorySink,
+    "parquet": ParquetHistorySink,
+}
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root, next to the benchmarks
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import synthetic_day  # noqa: E402
+from reconstruct import reconstruct_orderbook  # noqa: E402
+
+SYMBOLS = ("AAPL", "MSFT", "GOOGL")
+
+# Prices of the high priced file are above the int32 range of ticks
+HIGH_PRICE = 3_000_000_000
+
+# Options of reconstruct_orderbook selecting each way of storing the orders and histories
+STORES = (
+    {},
+    {"integer_prices": True},
+    {"integer_prices": True, "array_order_store": True},
+    {"integer_prices": True, "columnar": True},
+)
+
+
+def _write(path, data: bytes) -> str:
+    with open(path, "wb") as file:
+        file.write(data)
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def symbols():
+    return set(SYMBOLS)
+
+
+@pytest.fixture(scope="session")
+def itch_file(tmp_path_factory) -> str:
+    return _write(
+        tmp_path_factory.mktemp("itch") / "synthetic.itch",
+        synthetic_day(20_000, symbols=SYMBOLS),
+    )
+
+
+@pytest.fixture(scope="session")
+def high_price_file(tmp_path_factory) -> str:
+    return _write(
+        tmp_path_factory.mktemp("itch") / "high_price.itch",
+        synthetic_day(5_000, symbols=SYMBOLS, base_price=HIGH_PRICE),
+    )
+
+
+@pytest.fixture(params=STORES, ids=lambda options: "-".join(options) or "default")
+def store_options(request):
+    return request.param
+
+
+@pytest.fixture(scope="session")
+def replay(symbols):
+    """
+    Reconstructs the books of the synthetic symbols at depth 5, without a progress bar.
+    """
+
+    def replay(path: str, **kwargs):
+        return reconstruct_orderbook(path, symbols, 5, show_progress=False, **kwargs)
+
+    return replay
+
+
+@pytest.fixture(scope="session")
+def histories():
+    """
+    Gathers the order book and trade histories of each book, to compare reconstructions.
+    """
+
+    def histories(order_books):
+        return {
+            locate: (
+                book.stock_symbol,
+                [list(record) for record in book.order_book_history],
+                [tuple(trade) for trade in book.trades],
+            )
+            for locate, book in order_books.items()
+        }
+
+    return histories
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import filecmp
+import os
+
+import pandas as pd
+import pytest
+
+from bars import bar_name
+from parallel import reconstruct_orderbook_parallel
+
+BAR_SIZE = 10**8
+
+
+def _expected_bars(trades, integer_prices: bool) -> pd.DataFrame:
+    """
+    Aggregates the trades of a book into bars with a pandas groupby.
+    """
+    trades = pd.DataFrame(trades, columns=["timestamp", "shares", "price"])
+    if integer_prices:
+        trades["price"] /= 10_000
+    trades["notional"] = trades["shares"] * trades["price"]
+    trades["start"] = trades["timestamp"] - trades["timestamp"] % BAR_SIZE
+    bars = trades.groupby("start").agg(
+        open=("price", "first"),
+        high=("price", "max"),
+        low=("price", "min"),
+        close=("price", "last"),
+        volume=("shares", "sum"),
+        notional=("notional", "sum"),
+        trades=("price", "size"),
+    )
+    bars.insert(5, "vwap", bars.pop("notional") / bars["volume"])
+    return bars.reset_index()
+
+
+@pytest.mark.parametrize("integer_prices", (False, True))
+def test_bars_match_groupby(itch_file, replay, integer_prices):
+    books = replay(itch_file, integer_prices=integer_prices, bar_sizes=(BAR_SIZE,))
+    for book in books.values():
+        bars = book.bars[BAR_SIZE].to_frame()
+        assert len(bars) > 50
+        pd.testing.assert_frame_equal(
+            bars,
+            _expected_bars(list(book.trades), integer_prices),
+            check_dtype=False,
+        )
+
+
+def test_parallel_sink_bars_match_single_process(itch_file, symbols, replay, tmp_path):
+    single, parallel = tmp_path / "single", tmp_path / "parallel"
+    replay(itch_file, sink_directory=str(single), bar_sizes=(BAR_SIZE,))
+    books = reconstruct_orderbook_parallel(
+        itch_file,
+        symbols,
+        5,
+        workers=2,
+        sink_directory=str(parallel),
+        bar_sizes=(BAR_SIZE,),
+    )
+
+    assert len(books) == len(symbols)
+    for symbol in symbols:
+        path = os.path.join(symbol, f"{symbol}_{bar_name(BAR_SIZE)}.csv")
+        assert os.path.getsize(single / path) > 0
+        assert filecmp.cmp(single / path, parallel / path, shallow=False)
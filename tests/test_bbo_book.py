@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from bbo_book import BBOBook
+from reconstruct import reconstruct_orderbook
+
+OPTIONS = ({}, {"integer_prices": True}, {"integer_prices": True, "columnar": True})
+# Window starting and ending between messages of the synthetic day
+WINDOW = {"start_time": (4 * 3600 + 3) * 10**9, "end_time": (4 * 3600 + 6) * 10**9}
+
+
+def _replay(path, symbols, **kwargs):
+    return reconstruct_orderbook(path, symbols, 1, show_progress=False, **kwargs)
+
+
+@pytest.mark.parametrize("window", ({}, WINDOW), ids=("day", "window"))
+@pytest.mark.parametrize("options", OPTIONS, ids=("default", "integer", "columnar"))
+def test_bbo_book_matches_depth_one_book(
+    itch_file, symbols, histories, options, window
+):
+    bbo_books = _replay(itch_file, symbols, bbo_only=True, **options, **window)
+    books = _replay(itch_file, symbols, skip_unchanged=True, **options, **window)
+
+    assert all(isinstance(book, BBOBook) for book in bbo_books.values())
+    assert histories(bbo_books) == histories(books)
+    for locate, book in books.items():
+        for expected, ladder in zip(book.ladder(), bbo_books[locate].ladder()):
+            assert np.array_equal(expected, ladder)
+
+
+def test_bbo_book_level_orders_match_queues(itch_file, symbols):
+    bbo_books = _replay(itch_file, symbols, bbo_only=True)
+    books = _replay(itch_file, symbols)
+    for locate, book in books.items():
+        ladder = book.ladder()
+        for side, price in (("B", ladder.buy_prices[0]), ("S", ladder.sell_prices[-1])):
+            level = book.level_orders(side, price.item())
+            assert len(level) > 0
+            assert np.array_equal(
+                bbo_books[locate].level_orders(side, price.item()), level
+            )
+
+
+def test_bbo_book_notifies_bbo_changes(itch_file, symbols):
+    changes = {}
+
+    def on_book(book):
+        changes.setdefault(book.stock_symbol, []).append([])
+        book.subscribe(
+            "on_bbo_change", lambda *bbo: changes[book.stock_symbol][-1].append(bbo)
+        )
+
+    _replay(itch_file, symbols, bbo_only=True, on_book=on_book)
+    _replay(itch_file, symbols, on_book=on_book)
+    for bbo_changes, book_changes in changes.values():
+        assert len(bbo_changes) > 0 and bbo_changes == book_changes
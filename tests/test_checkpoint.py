@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from checkpoint import book_orders, books_orders, list_checkpoints
+
+
+def _assert_resume_matches_replay(path, replay, histories, directory, **options):
+    """
+    Checkpoints a reconstruction, then resumes it from the middle of the first book's
+    history and compares it with a replay of the file from its start.
+    """
+    directory = str(directory / "checkpoints")
+    full = replay(
+        path, checkpoint_directory=directory, checkpoint_interval=10**9, **options
+    )
+    assert len(list_checkpoints(directory)) > 1
+
+    history = list(next(iter(full.values())).order_book_history)
+    start_time = int(history[len(history) // 2][0])
+    resumed = replay(
+        path,
+        start_time=start_time,
+        checkpoint_directory=directory,
+        resume=True,
+        **options,
+    )
+    replayed = replay(path, start_time=start_time, **options)
+    assert histories(resumed) == histories(replayed)
+
+
+def test_resume_matches_full_replay(
+    itch_file, replay, histories, store_options, tmp_path
+):
+    _assert_resume_matches_replay(
+        itch_file, replay, histories, tmp_path, **store_options
+    )
+
+
+@pytest.mark.parametrize("array_order_store", (False, True))
+def test_resume_keeps_prices_above_int32_range(
+    high_price_file, replay, histories, array_order_store, tmp_path
+):
+    _assert_resume_matches_replay(
+        high_price_file,
+        replay,
+        histories,
+        tmp_path,
+        integer_prices=True,
+        array_order_store=array_order_store,
+    )
+
+
+def test_shared_store_orders_match_each_book(itch_file, replay):
+    books = replay(itch_file, integer_prices=True, array_order_store=True)
+    gathered = books_orders(books)
+
+    assert gathered.keys() == books.keys()
+    for locate, book in books.items():
+        assert len(gathered[locate]) == len(book.orders) > 0
+        assert np.array_equal(gathered[locate], book_orders(book))
+
+
+def test_resume_rejects_sink_directory(itch_file, replay, tmp_path):
+    directory = str(tmp_path / "checkpoints")
+    replay(itch_file, checkpoint_directory=directory, checkpoint_interval=10**9)
+    with pytest.raises(ValueError):
+        replay(
+            itch_file,
+            checkpoint_directory=directory,
+            resume=True,
+            sink_directory=str(tmp_path / "output"),
+        )
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import pandas as pd
+
+from delta_history import DeltaHistory
+
+
+def _assert_delta_matches_csv(book, directory) -> None:
+    """
+    Exports a book to CSV and to the delta format, and compares the delta rows read back.
+    """
+    book.export_to_csv(str(directory))
+    book.export_to_delta(str(directory), keyframe_interval=64)
+    prefix = directory / book.stock_symbol / f"{book.stock_symbol}_order_book_history"
+    exported = pd.read_csv(f"{prefix}.csv", float_precision="round_trip")
+    delta = DeltaHistory(f"{prefix}.delta")
+
+    assert len(delta) == len(exported) > 200
+    pd.testing.assert_frame_equal(delta.to_frame(), exported, check_dtype=False)
+    # Rows read from the middle of a keyframe interval
+    pd.testing.assert_frame_equal(
+        delta.to_frame(100, 200),
+        exported.iloc[100:200].reset_index(drop=True),
+        check_dtype=False,
+    )
+
+
+def test_delta_history_matches_csv_export(itch_file, replay, store_options, tmp_path):
+    for book in replay(itch_file, **store_options).values():
+        _assert_delta_matches_csv(book, tmp_path)
+
+
+def test_delta_history_keeps_prices_above_int32_range(
+    high_price_file, replay, tmp_path
+):
+    for book in replay(high_price_file, integer_prices=True).values():
+        _assert_delta_matches_csv(book, tmp_path)
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from features import FEATURE_COLUMNS, FeatureEngine
+
+
+def _expected_features(history) -> pd.DataFrame:
+    """
+    Computes the features of two levels from each state of a full order book history.
+    """
+    rows = []
+    previous = (-np.inf, 0, np.inf, 0)
+    for record in history:
+        record = [np.nan if value is None else value for value in record]
+        bid, bid_shares, ask, ask_shares = record[1:5]
+        buy_depth = np.nansum([bid_shares, record[6]])
+        sell_depth = np.nansum([ask_shares, record[8]])
+        best = (
+            -np.inf if np.isnan(bid) else bid,
+            np.nan_to_num(bid_shares),
+            np.inf if np.isnan(ask) else ask,
+            np.nan_to_num(ask_shares),
+        )
+        # Shares added at or beyond the previous best prices, minus the shares removed
+        ofi = (
+            (best[0] >= previous[0]) * best[1]
+            - (best[0] <= previous[0]) * previous[1]
+            - (best[2] <= previous[2]) * best[3]
+            + (best[2] >= previous[2]) * previous[3]
+        )
+        previous = best
+        total = buy_depth + sell_depth
+        rows.append(
+            (
+                bid,
+                ask,
+                ask - bid,
+                (bid + ask) / 2,
+                (bid * ask_shares + ask * bid_shares) / (bid_shares + ask_shares),
+                (buy_depth - sell_depth) / total if total else np.nan,
+                ofi,
+            )
+        )
+    return pd.DataFrame(rows, columns=list(FEATURE_COLUMNS))
+
+
+@pytest.mark.parametrize("integer_prices", (False, True))
+def test_features_match_book_history(itch_file, replay, integer_prices):
+    books = replay(itch_file, integer_prices=integer_prices, feature_levels=2)
+    # Expected features are computed from the decimal prices of a book without features
+    reference = replay(itch_file)
+    for locate, book in books.items():
+        history = reference[locate].order_book_history
+        features = book.features.to_frame()
+
+        assert features["timestamp"].tolist() == [record[0] for record in history]
+        pd.testing.assert_frame_equal(
+            features.drop(columns="timestamp"),
+            _expected_features(history),
+            check_dtype=False,
+        )
+
+
+def test_feature_engine_requires_a_level():
+    with pytest.raises(ValueError):
+        FeatureEngine(levels=0)
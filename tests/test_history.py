@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import pytest
+
+from history import BookHistory, TradeHistory
+
+
+@pytest.mark.parametrize("integer_prices", (False, True))
+def test_book_history_grows_and_keeps_missing_levels(integer_prices):
+    history = BookHistory(2, integer_prices, capacity=2)
+    records = []
+    for i in range(1, 100):
+        buy = [(1000 - i, i)] if i % 3 else []
+        sell = [(1000 + i, i), (1001 + i, 2 * i)]
+        history.append_levels(i, buy, sell)
+        records.append(
+            [i, *(buy[0] if buy else (None, None)), *sell[0], None, None, *sell[1]]
+        )
+
+    assert len(history) == len(history.timestamps) == 99
+    assert list(history) == records
+    assert history.missing_levels(history.buy_prices[:, 0]).sum() == 33
+    assert list(history.to_frame().columns) == [name for name, _ in history.columns()]
+
+
+def test_trade_history_keeps_prices_above_int32_range():
+    trades = TradeHistory(capacity=1)
+    expected = [(i, 100, 3_000_000_000 + i) for i in range(10)]
+    for trade in expected:
+        trades.append(trade)
+    assert list(trades) == expected
+
+
+def test_columnar_replay_matches_lists(itch_file, high_price_file, replay, histories):
+    for path in (itch_file, high_price_file):
+        assert histories(replay(path, integer_prices=True, columnar=True)) == histories(
+            replay(path, integer_prices=True)
+        )
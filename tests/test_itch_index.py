@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from itch_index import ItchIndex, build_index
+
+
+def test_index_replay_matches_full_scan(itch_file, replay, histories, store_options):
+    index_path = build_index(itch_file)
+    assert histories(
+        replay(itch_file, index_path=index_path, **store_options)
+    ) == histories(replay(itch_file, **store_options))
+
+
+def test_index_replay_of_time_window(itch_file, replay, histories):
+    index_path = build_index(itch_file)
+    start_time, end_time = (4 * 3600 + 3) * 10**9, (4 * 3600 + 6) * 10**9
+    indexed = replay(
+        itch_file, index_path=index_path, start_time=start_time, end_time=end_time
+    )
+    assert histories(indexed) == histories(
+        replay(itch_file, start_time=start_time, end_time=end_time)
+    )
+
+
+def test_index_lists_symbols(itch_file, symbols):
+    index = ItchIndex(build_index(itch_file), itch_file)
+    assert set(index.symbols.values()) == symbols
+    # The synthetic messages and the stock directory message of each symbol
+    messages = sum(index.message_count(locate) for locate in index.symbols)
+    assert messages == 20_000 + len(symbols)
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import io
+import struct
+
+import pytest
+
+from benchmarks.synthetic import sample_bodies
+from itch_reader import iter_message_offsets, iter_messages, iter_selected_messages
+
+
+def _messages():
+    return list(sample_bodies().items()) * 3
+
+
+def _framed(messages) -> bytes:
+    return b"".join(
+        struct.pack("!H", len(body) + 1) + message_type + body
+        for message_type, body in messages
+    )
+
+
+@pytest.mark.parametrize("block_size", (1, 7, 64, 1 << 22))
+def test_iter_messages_across_blocks(block_size):
+    messages = _messages()
+    data = _framed(messages)
+    consumed = []
+
+    read = [
+        (message_type, bytes(body))
+        for message_type, body in iter_messages(
+            io.BytesIO(data), block_size, consumed.append
+        )
+    ]
+    assert read == messages
+    assert sum(consumed) == len(data)
+
+
+def test_iter_message_offsets_in_place():
+    messages = _messages()
+    data = _framed(messages)
+    read = list(iter_message_offsets(data, progress_interval=100))
+
+    assert [message_type for message_type, _ in read] == [
+        message_type for message_type, _ in messages
+    ]
+    assert [
+        data[offset : offset + len(body)]
+        for (_, offset), (_, body) in zip(read, messages)
+    ] == [body for _, body in messages]
+    # Messages of a subset are found again from their offsets
+    offsets = [offset for _, offset in read[::4]]
+    assert list(iter_selected_messages(data, offsets)) == read[::4]
+
+
+def test_truncated_file_is_rejected():
+    data = _framed(_messages())[:-5]
+    with pytest.raises(ValueError):
+        list(iter_messages(io.BytesIO(data), 64))
+    with pytest.raises(ValueError):
+        list(iter_message_offsets(data))
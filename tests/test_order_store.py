@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from order_store import ArrayOrderStore
+from orderbook import Order
+
+
+def test_views_of_a_store_keep_their_stocks_apart():
+    store = ArrayOrderStore(capacity=4)
+    first, second = store.view(1), store.view(2)
+    first[3] = Order(10, 3, "B", 100, 1_000_000)
+    # Reference numbers past the capacity grow the columns
+    second[100] = Order(11, 100, "S", 200, 1_000_100)
+
+    assert store.capacity > 100
+    assert 3 in first and 3 not in second and 100 in second
+    order = second[100]
+    assert (order.timestamp, order.buy_sell_indicator, order.shares, order.price) == (
+        11,
+        "S",
+        200,
+        1_000_100,
+    )
+    second.set_shares(100, 50)
+    assert second.pop(100).shares == 50
+    assert 100 not in second and len(second) == 0 and list(first) == [3]
+    with pytest.raises(KeyError):
+        second[100]
+
+
+def test_store_keeps_prices_above_int32_range():
+    orders = ArrayOrderStore().view(1)
+    orders[1] = Order(0, 1, "B", 100, 4_000_000_000)
+    assert orders[1].price == 4_000_000_000
+
+
+def test_locate_order_ref_numbers_match_views():
+    store = ArrayOrderStore(capacity=16)
+    views = {locate: store.view(locate) for locate in (1, 2, 3)}
+    for ref in range(1, 60):
+        views[ref % 3 + 1][ref] = Order(ref, ref, "B", 100, 1_000_000)
+    for ref in range(1, 60, 4):
+        views[ref % 3 + 1].pop(ref)
+
+    refs = store.locate_order_ref_numbers()
+    assert refs.keys() == views.keys()
+    for locate, view in views.items():
+        assert np.array_equal(refs[locate], view.order_ref_numbers())
+
+
+def test_array_store_replay_matches_dictionary(
+    itch_file, high_price_file, replay, histories
+):
+    for path in (itch_file, high_price_file):
+        assert histories(
+            replay(path, integer_prices=True, array_order_store=True)
+        ) == histories(replay(path, integer_prices=True))
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import filecmp
+import os
+
+import pytest
+
+from itch_index import build_index
+from parallel import reconstruct_orderbook_parallel
+
+
+@pytest.mark.parametrize("indexed", (False, True), ids=("scan", "index"))
+def test_parallel_replay_matches_single_process(
+    itch_file, symbols, replay, histories, store_options, indexed
+):
+    index_path = build_index(itch_file) if indexed else None
+    books = reconstruct_orderbook_parallel(
+        itch_file, symbols, 5, workers=2, index_path=index_path, **store_options
+    )
+    assert histories(books) == histories(replay(itch_file, **store_options))
+
+
+def test_parallel_replay_defaults_to_every_symbol(itch_file, symbols):
+    books = reconstruct_orderbook_parallel(itch_file, workers=2)
+    assert {book.stock_symbol for book in books.values()} == symbols
+
+
+def test_parallel_sink_matches_single_process(itch_file, symbols, replay, tmp_path):
+    single, parallel = tmp_path / "single", tmp_path / "parallel"
+    replay(itch_file, sink_directory=str(single))
+    reconstruct_orderbook_parallel(
+        itch_file, symbols, 5, workers=2, sink_directory=str(parallel)
+    )
+
+    for symbol in symbols:
+        for name in ("order_book_history", "trades"):
+            path = os.path.join(symbol, f"{symbol}_{name}.csv")
+            assert filecmp.cmp(single / path, parallel / path, shallow=False)
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+import parse_itch5 as itch
+from benchmarks.synthetic import sample_bodies
+
+
+@pytest.mark.parametrize("integer_prices", (False, True))
+def test_prices_in_ticks_or_dollars(integer_prices):
+    bodies = sample_bodies()
+    add = itch.parse_add_order(bodies[b"A"], integer_prices=integer_prices)
+    replace = itch.parse_order_replace(bodies[b"U"], integer_prices=integer_prices)
+    if integer_prices:
+        assert (add[-1], replace[-1]) == (1052500, 1052400)
+    else:
+        assert (add[-1], replace[-1]) == (105.25, 105.24)
+
+
+def test_bulk_decoded_prices_above_int32_range(high_price_file):
+    with open(high_price_file, "rb") as file:
+        data = file.read()
+    index = itch.index_messages(data)
+    adds = itch.decode_message_array(data, index, b"A", integer_prices=True)
+    offsets = index.offsets[index.types == ord("A")]
+
+    assert adds["price"].dtype == np.uint32
+    assert adds["price"].min() > np.iinfo(np.int32).max
+    assert adds["price"].tolist() == [
+        itch.parse_add_order(data, offset, integer_prices=True)[-1]
+        for offset in offsets.tolist()
+    ]
+
+
+def test_mmap_replay_matches_stream_replay(
+    itch_file, high_price_file, replay, histories
+):
+    for path in (itch_file, high_price_file):
+        expected = histories(replay(path, integer_prices=True))
+        assert histories(replay(path, integer_prices=True, use_mmap=True)) == expected
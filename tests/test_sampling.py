@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import bisect
+
+import pytest
+
+from orderbook import OrderBook
+
+
+def _as_of(history, start: int, end: int, interval: int):
+    """
+    Looks up the state in effect at every grid point from start to end in a full history.
+    """
+    timestamps = [record[0] for record in history]
+    states = []
+    for grid_point in range(start, end + 1, interval):
+        record = history[bisect.bisect_right(timestamps, grid_point) - 1]
+        states.append([grid_point, *record[1:]])
+    return states
+
+
+@pytest.mark.parametrize("interval", (10**6, 10**8))
+def test_clock_sampling_matches_as_of_lookup(itch_file, replay, interval):
+    full = replay(itch_file)
+    # The end of the window is past the last message, the last state is carried to it
+    end_time = max(book.order_book_history[-1][0] for book in full.values()) + 10**9
+    sampled = replay(itch_file, sample_interval=interval, end_time=end_time)
+
+    for locate, book in full.items():
+        history = book.order_book_history
+        start = -(-history[0][0] // interval) * interval
+        expected = _as_of(history, start, end_time, interval)
+        assert [list(record) for record in sampled[locate].order_book_history] == (
+            expected
+        )
+
+
+def test_event_sampling_keeps_every_nth_state(itch_file, replay):
+    full = replay(itch_file)
+    sampled = replay(itch_file, sample_events=7)
+    for locate, book in full.items():
+        assert sampled[locate].order_book_history == book.order_book_history[6::7]
+
+
+def test_clock_and_event_sampling_are_exclusive():
+    with pytest.raises(ValueError):
+        OrderBook("AAPL", sample_interval=10**9, sample_events=10)
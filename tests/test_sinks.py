@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import filecmp
+import os
+
+import pytest
+
+OPTIONS = (
+    {},
+    {"integer_prices": True},
+    {"integer_prices": True, "array_order_store": True},
+)
+
+
+@pytest.mark.parametrize("options", OPTIONS, ids=("default", "integer", "store"))
+def test_csv_sink_matches_export(itch_file, replay, options, tmp_path):
+    exported, streamed = tmp_path / "exported", tmp_path / "streamed"
+    for book in replay(itch_file, **options).values():
+        book.export_to_csv(str(exported))
+    # A limit far below the number of rows forces the buffers to spill many times
+    books = replay(
+        itch_file, sink_directory=str(streamed), sink_buffer_limit=300, **options
+    )
+
+    for book in books.values():
+        for name in ("order_book_history", "trades"):
+            path = os.path.join(book.stock_symbol, f"{book.stock_symbol}_{name}.csv")
+            assert filecmp.cmp(exported / path, streamed / path, shallow=False)
+
+
+def test_parquet_sink_matches_export(itch_file, replay, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    exported, streamed = tmp_path / "exported", tmp_path / "streamed"
+    for book in replay(itch_file, integer_prices=True).values():
+        book.export_to_parquet(str(exported))
+    books = replay(
+        itch_file,
+        integer_prices=True,
+        sink_directory=str(streamed),
+        sink_format="parquet",
+        sink_buffer_limit=700,
+    )
+
+    for book in books.values():
+        for name in ("order_book_history", "trades"):
+            path = os.path.join(
+                book.stock_symbol, f"{book.stock_symbol}_{name}.parquet"
+            )
+            assert pq.read_table(exported / path).equals(pq.read_table(streamed / path))
+        # Merged part files leave a single file per history
+        assert sorted(os.listdir(streamed / book.stock_symbol)) == [
+            f"{book.stock_symbol}_order_book_history.parquet",
+            f"{book.stock_symbol}_trades.parquet",
+        ]
+
+
+def test_export_of_sink_book_keeps_streamed_files(itch_file, replay, tmp_path):
+    books = replay(itch_file, sink_directory=str(tmp_path))
+    book = next(iter(books.values()))
+    path = tmp_path / book.stock_symbol / f"{book.stock_symbol}_order_book_history.csv"
+    size = os.path.getsize(path)
+
+    for export in (
+        book.export_to_csv,
+        book.export_to_parquet,
+        book.export_to_feather,
+        book.export_to_delta,
+    ):
+        with pytest.raises(ValueError):
+            export(str(tmp_path))
+    assert os.path.getsize(path) == size > 0
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import pytest
+
+from orderbook import Order, OrderBook
+
+OPTIONS = ({}, {"integer_prices": True, "array_order_store": True})
+
+
+@pytest.mark.parametrize("options", OPTIONS, ids=("default", "store"))
+def test_subscribers_track_live_orders_and_trades(itch_file, replay, options):
+    shadows, trades = {}, {}
+
+    def on_book(book):
+        # Remaining shares of each live order, as seen by the subscribers
+        shadow = shadows[book.stock_symbol] = {}
+        trades[book.stock_symbol] = []
+
+        def set_shares(timestamp, order, *_):
+            if order.shares:
+                shadow[order.order_ref_number] = order.shares
+            else:
+                del shadow[order.order_ref_number]
+
+        def replace(timestamp, order, new_order):
+            del shadow[order.order_ref_number]
+            shadow[new_order.order_ref_number] = new_order.shares
+
+        book.subscribe("on_add", set_shares)
+        book.subscribe("on_execute", set_shares)
+        book.subscribe("on_cancel", set_shares)
+        book.subscribe(
+            "on_delete", lambda timestamp, order: shadow.pop(order.order_ref_number)
+        )
+        book.subscribe("on_replace", replace)
+        book.subscribe(
+            "on_trade", lambda *trade: trades[book.stock_symbol].append(trade)
+        )
+
+    books = replay(itch_file, on_book=on_book, **options)
+    for book in books.values():
+        live = {ref: book.orders[ref].shares for ref in book.orders}
+        assert shadows[book.stock_symbol] == live and len(live) > 0
+        assert trades[book.stock_symbol] == list(book.trades)
+
+
+def test_bbo_changes_match_best_levels(itch_file, replay):
+    changes = {}
+
+    def on_book(book):
+        changes[book.stock_symbol] = []
+        book.subscribe(
+            "on_bbo_change", lambda *bbo: changes[book.stock_symbol].append(bbo)
+        )
+
+    for book in replay(itch_file, on_book=on_book).values():
+        # Best levels after every message, with None prices and 0 shares for an empty side
+        expected, last = [], None
+        for timestamp, bid, bid_shares, ask, ask_shares, *_ in book.order_book_history:
+            bbo = (bid, bid_shares or 0, ask, ask_shares or 0)
+            if bbo != last:
+                expected.append((timestamp, *bbo))
+                last = bbo
+        assert changes[book.stock_symbol] == expected
+
+
+def test_full_execution_reports_no_remaining_shares():
+    book = OrderBook("AAPL", integer_prices=True)
+    executions = []
+
+    def on_execute(timestamp, order, shares, price):
+        executions.append((order.shares, shares, price))
+
+    book.subscribe("on_execute", on_execute)
+    book.add_order(Order(1, 7, "B", 100, 1_000_000))
+    book.process_trade(2, 7, 40)
+    book.process_trade(3, 7, 60)
+    book.unsubscribe("on_execute", on_execute)
+    book.add_order(Order(4, 8, "B", 100, 1_000_000))
+    book.process_trade(5, 8, 100)
+
+    assert executions == [(60, 40, 1_000_000), (0, 60, 1_000_000)]
+    with pytest.raises(ValueError):
+        book.subscribe("on_fill", on_execute)